@@ -0,0 +1,239 @@
+# bench_distances_db.py
+"""
+Porovnanie starej schémy city_distances (mená ako TEXT v každom riadku + raw_json)
+s kompaktnou schémou cities + city_pairs (WITHOUT ROWID) na syntetickej DB.
+
+    python bench_distances_db.py                 # 1 000 000 dvojíc
+    python bench_distances_db.py --pairs 100000  # rýchlejší beh
+
+Postup: vygeneruje starú DB, zmeria veľkosť a rýchlosť lookupov, skopíruje ju,
+zmigruje cez dbcache.init_db() a zmeria to isté na novej schéme.
+"""
+import argparse
+import json
+import math
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import dbcache
+
+LEGACY_SCHEMA = """
+    CREATE TABLE city_distances (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        city1 TEXT NOT NULL,
+        city2 TEXT NOT NULL,
+        driving_time_seconds INTEGER NOT NULL,
+        driving_time_human TEXT NOT NULL,
+        distance_km_road REAL NOT NULL,
+        distance_km_air REAL NOT NULL,
+        raw_json TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(city1, city2)
+    );
+"""
+
+
+def _city_names(pairs: int) -> List[str]:
+    # najmenší počet miest, ktorých všetky dvojice pokryjú `pairs`
+    n = math.ceil((1 + math.sqrt(1 + 8 * pairs)) / 2)
+    return [f"mesto {i:05d}" for i in range(n)]
+
+
+def _legacy_rows(cities: List[str], pairs: int):
+    rng = random.Random(42)
+    count = 0
+    for i, c1 in enumerate(cities):
+        for c2 in cities[i + 1:]:
+            if count >= pairs:
+                return
+            km_air = rng.uniform(5, 400)
+            km_road = round(km_air * rng.uniform(1.15, 1.5), 2)
+            seconds = int(km_road / 70 * 3600)
+            record = {
+                "city1": c1,
+                "city2": c2,
+                "driving_time_seconds": seconds,
+                "driving_time_human": dbcache.format_duration(seconds),
+                "distance_km_road": km_road,
+                "distance_km_air": round(km_air, 2),
+            }
+            yield (
+                c1,
+                c2,
+                seconds,
+                record["driving_time_human"],
+                km_road,
+                record["distance_km_air"],
+                json.dumps(record, ensure_ascii=False),
+            )
+            count += 1
+
+
+def build_legacy_db(path: Path, cities: List[str], pairs: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(LEGACY_SCHEMA)
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO city_distances (
+                city1, city2, driving_time_seconds, driving_time_human,
+                distance_km_road, distance_km_air, raw_json
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            _legacy_rows(cities, pairs),
+        )
+    # kľúče sú už kanonické (user_version 1) – migrácia pôjde iba na novú schému
+    conn.execute("PRAGMA user_version = 1")
+    conn.close()
+
+
+def db_size(path: Path) -> int:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return path.stat().st_size
+
+
+def _workload(cities: List[str], queries: int, batch: int) -> List[Tuple[str, List[str]]]:
+    rng = random.Random(7)
+    return [(rng.choice(cities), rng.sample(cities, batch)) for _ in range(queries)]
+
+
+def _timed(fn: Callable[[], None], lookups: int) -> float:
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) / lookups * 1e6
+
+
+def bench_legacy(path: Path, workload: List[Tuple[str, List[str]]]) -> Tuple[float, float]:
+    conn = sqlite3.connect(path)
+    lookups = sum(len(dests) for _, dests in workload)
+
+    def single():
+        # pôvodný get_mcp_record – dvojica v ľubovoľnom poradí cez OR
+        for origin, dests in workload:
+            for dest in dests:
+                conn.execute(
+                    """
+                    SELECT distance_km_road, driving_time_seconds FROM city_distances
+                    WHERE (city1 = ? AND city2 = ?) OR (city1 = ? AND city2 = ?)
+                    """,
+                    (origin, dest, dest, origin),
+                ).fetchone()
+
+    def bulk():
+        # get_distances_bulk pred migráciou – VALUES join v kanonickom poradí
+        for origin, dests in workload:
+            pairs = [(min(origin, d), max(origin, d)) for d in dests]
+            values = ", ".join("(?, ?)" for _ in pairs)
+            conn.execute(
+                f"""
+                WITH wanted(city1, city2) AS (VALUES {values})
+                SELECT d.city1, d.city2, d.distance_km_road, d.driving_time_seconds,
+                       CAST(strftime('%s', d.created_at) AS INTEGER)
+                FROM wanted
+                JOIN city_distances d
+                  ON d.city1 = wanted.city1 AND d.city2 = wanted.city2
+                """,
+                [name for pair in pairs for name in pair],
+            ).fetchall()
+
+    result = (_timed(single, lookups), _timed(bulk, lookups))
+    conn.close()
+    return result
+
+
+def bench_compact(path: Path, workload: List[Tuple[str, List[str]]]) -> Tuple[float, float]:
+    # rovnaké dotazy ako dbcache.get_mcp_record / get_distances_bulk (bez LRU a citynames)
+    conn = sqlite3.connect(path)
+    lookups = sum(len(dests) for _, dests in workload)
+
+    def single():
+        for origin, dests in workload:
+            for dest in dests:
+                conn.execute(
+                    """
+                    SELECT p.distance_m_road, p.driving_time_seconds
+                    FROM cities a
+                    JOIN cities b ON b.name = ?
+                    JOIN city_pairs p
+                      ON p.city1_id = min(a.id, b.id) AND p.city2_id = max(a.id, b.id)
+                    WHERE a.name = ?
+                    """,
+                    (dest, origin),
+                ).fetchone()
+
+    def bulk():
+        for origin, dests in workload:
+            values = ", ".join("(?, ?)" for _ in dests)
+            conn.execute(
+                f"""
+                WITH wanted(city1, city2) AS (VALUES {values})
+                SELECT wanted.city1, wanted.city2, p.distance_m_road,
+                       p.driving_time_seconds, p.created_at
+                FROM wanted
+                JOIN cities a ON a.name = wanted.city1
+                JOIN cities b ON b.name = wanted.city2
+                JOIN city_pairs p
+                  ON p.city1_id = min(a.id, b.id) AND p.city2_id = max(a.id, b.id)
+                """,
+                [name for dest in dests for name in (origin, dest)],
+            ).fetchall()
+
+    result = (_timed(single, lookups), _timed(bulk, lookups))
+    conn.close()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark schémy distances.db.")
+    parser.add_argument("--pairs", type=int, default=1_000_000, help="Počet dvojíc v syntetickej DB.")
+    parser.add_argument("--queries", type=int, default=200, help="Počet lookup dávok.")
+    parser.add_argument("--batch", type=int, default=50, help="Cieľov v jednej dávke.")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_distances_"))
+    legacy_path = workdir / "legacy.db"
+    compact_path = workdir / "compact.db"
+
+    cities = _city_names(args.pairs)
+    workload = _workload(cities, args.queries, args.batch)
+
+    try:
+        print(f"[BENCH] {len(cities)} miest, {args.pairs} dvojíc, DB v {workdir}")
+
+        started = time.perf_counter()
+        build_legacy_db(legacy_path, cities, args.pairs)
+        print(f"[BENCH] Stará DB vytvorená za {time.perf_counter() - started:.1f} s.")
+        legacy_size = db_size(legacy_path)
+        legacy_single, legacy_bulk = bench_legacy(legacy_path, workload)
+
+        shutil.copy(legacy_path, compact_path)
+        dbcache.DB_PATH = compact_path
+        started = time.perf_counter()
+        dbcache.init_db()
+        migration = time.perf_counter() - started
+        compact_size = db_size(compact_path)
+        compact_single, compact_bulk = bench_compact(compact_path, workload)
+
+        print()
+        print(f"{'':<28}{'city_distances':>16}{'city_pairs':>16}")
+        print(f"{'veľkosť DB (MB)':<28}{legacy_size / 2**20:>16.1f}{compact_size / 2**20:>16.1f}")
+        print(f"{'bajtov na dvojicu':<28}{legacy_size / args.pairs:>16.1f}{compact_size / args.pairs:>16.1f}")
+        print(f"{'lookup jednej dvojice (µs)':<28}{legacy_single:>16.1f}{compact_single:>16.1f}")
+        print(f"{'bulk lookup / dvojica (µs)':<28}{legacy_bulk:>16.1f}{compact_bulk:>16.1f}")
+        print(f"\nMigrácia (vrátane VACUUM): {migration:.1f} s, "
+              f"zmenšenie {legacy_size / compact_size:.1f}×.")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# bench_workflow.py
+"""
+Réžia na jeden request pred a po zdieľaní skompilovaného grafu a LLM klientov.
+
+    python bench_workflow.py
+    python bench_workflow.py --requests 500
+
+Meria:
+- build_workflow() pri každom requeste vs. get_workflow() (skompilované raz),
+- nový ChatOpenAI pri každom volaní vs. shared_chat_model() (jeden pool),
+- HTTP request s novým klientom (nové TCP spojenie) vs. zdieľaný keep-alive pool
+  – lokálny server bez TLS, reálny rozdiel k providerovi je o TLS handshake väčší.
+Na LLM providera sa nič neposiela.
+"""
+import argparse
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+import httpx
+
+# ChatOpenAI bez kľúča nejde vytvoriť; request sa nikdy neodošle
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench-not-used")
+
+from langchain_openai import ChatOpenAI  # noqa: E402
+
+from config import MODEL_NAME  # noqa: E402
+from llm_clients import shared_chat_model  # noqa: E402
+from workflow import build_workflow, get_workflow  # noqa: E402
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _per_call_ms(fn: Callable[[], object], n: int) -> float:
+    fn()  # zahriatie (importy, prvá kompilácia)
+    started = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - started) / n * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark réžie workflow a LLM klientov.")
+    parser.add_argument("--requests", type=int, default=200, help="Počet opakovaní každého merania.")
+    args = parser.parse_args()
+    n = args.requests
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    pooled = httpx.Client()
+
+    def fresh_http():
+        with httpx.Client() as client:
+            client.get(url)
+
+    rows = [
+        ("graf", lambda: build_workflow(), lambda: get_workflow()),
+        (
+            "LLM klient",
+            lambda: ChatOpenAI(model=MODEL_NAME, temperature=0.1),
+            lambda: shared_chat_model(temperature=0.1),
+        ),
+        ("HTTP request", fresh_http, lambda: pooled.get(url)),
+    ]
+
+    try:
+        print(f"{'':<16}{'pred (ms)':>12}{'po (ms)':>12}")
+        total_before = total_after = 0.0
+        for label, before, after in rows:
+            ms_before = _per_call_ms(before, n)
+            ms_after = _per_call_ms(after, n)
+            total_before += ms_before
+            total_after += ms_after
+            print(f"{label:<16}{ms_before:>12.3f}{ms_after:>12.3f}")
+        print(f"{'spolu':<16}{total_before:>12.3f}{total_after:>12.3f}")
+    finally:
+        pooled.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+# cache_cli.py
+"""
+Offline správa distances.db.
+
+Príklady:
+    # všetky dvojice z jedného zoznamu miest (CSV so stĺpcom "name" alebo 1. stĺpec)
+    python cache_cli.py prewarm --cities mesta.csv
+
+    # všetky dvojice miest z gazetteer.csv (voliteľne iba nad N obyvateľov)
+    python cache_cli.py prewarm --from-gazetteer [--min-population 10000]
+
+    # vybrané východzie mestá × ciele
+    python cache_cli.py prewarm --origins vychodzie.csv --destinations ciele.csv
+
+    # import predpočítanej matice (city1, city2, distance_km_road, driving_time_seconds
+    # [, distance_km_air, driving_time_human])
+    python cache_cli.py import-matrix matica.csv
+
+    # negatívna cache (mestá/trasy, ktoré MCP nevedel vyriešiť)
+    python cache_cli.py failures list
+    python cache_cli.py failures clear [--city Trenčín]
+
+    # cache LLM zoznamov kandidátskych miest
+    python cache_cli.py llm-cache clear [--city Vrbové]
+
+    # aliasy miest (iný zápis -> kanonické mesto)
+    python cache_cli.py alias add "Bratislava-Petržalka" Bratislava
+    python cache_cli.py alias list
+
+Prewarm je prerušiteľný – už uložené dvojice sa pri ďalšom spustení preskočia.
+"""
+import argparse
+import asyncio
+import csv
+import time
+from typing import Dict, Iterable, List
+
+import dbcache
+from gazetteer import get_gazetteer
+from mcp_client import fetch_driving_matrix, mcp_pool
+
+
+def _read_city_csv(path: str) -> List[str]:
+    """Načíta mestá z CSV – stĺpec "name" (ak existuje), inak prvý stĺpec."""
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return []
+
+    header = [h.strip().lower() for h in rows[0]]
+    if "name" in header:
+        idx = header.index("name")
+        rows = rows[1:]
+    else:
+        idx = 0
+
+    cities: List[str] = []
+    seen = set()
+    for row in rows:
+        if len(row) <= idx or not row[idx].strip():
+            continue
+        city = row[idx].strip()
+        if city not in seen:
+            seen.add(city)
+            cities.append(city)
+    return cities
+
+
+def _plan_pairs(origins: List[str], destinations: List[str]) -> Dict[str, List[str]]:
+    """
+    { východzie mesto: [ciele] } bez dvojíc mesta so sebou a bez symetrických duplicít
+    (A→B a B→A je v DB jeden riadok).
+    """
+    planned = set()
+    plan: Dict[str, List[str]] = {}
+    for origin in origins:
+        for dest in destinations:
+            key = dbcache._pair_key(origin, dest)
+            if key[0] == key[1] or key in planned:
+                continue
+            planned.add(key)
+            plan.setdefault(origin, []).append(dest)
+    return plan
+
+
+async def prewarm(origins: List[str], destinations: List[str], batch_size: int) -> None:
+    plan = _plan_pairs(origins, destinations)
+    total = sum(len(dests) for dests in plan.values())
+    print(f"[PREWARM] {len(plan)} východzích miest, {total} dvojíc.")
+
+    started = time.perf_counter()
+    done = skipped = failed = 0
+
+    await mcp_pool.start()
+    try:
+        for origin, dests in plan.items():
+            # resume – už uložené dvojice preskočíme
+            cached = dbcache.get_distances_bulk(origin, dests)
+            known_bad = dbcache.get_known_failures(origin, dests)
+            todo = [d for d in dests if d not in cached and d not in known_bad]
+            skipped += len(dests) - len(todo)
+
+            for i in range(0, len(todo), batch_size):
+                batch = todo[i:i + batch_size]
+                results, failures = await fetch_driving_matrix(origin, batch)
+                done += dbcache.save_mcp_records_bulk(results)
+                dbcache.save_failures(origin, failures)
+                failed += len(failures)
+
+                for dest, (kind, reason) in failures.items():
+                    print(f"[PREWARM] {origin} → {dest} ({kind}): {reason}")
+
+                elapsed = time.perf_counter() - started
+                print(
+                    f"[PREWARM] {done + skipped + failed}/{total} "
+                    f"(nové {done}, preskočené {skipped}, chyby {failed}) – "
+                    f"{done / elapsed:.1f} dvojíc/s"
+                )
+    finally:
+        await mcp_pool.stop()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"[PREWARM] Hotovo za {elapsed:.1f} s: nové {done}, preskočené {skipped}, "
+        f"chyby {failed} ({done / elapsed if elapsed else 0:.1f} dvojíc/s)."
+    )
+
+
+def _matrix_records(path: str) -> Iterable[Dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            seconds = float(row["driving_time_seconds"])
+            yield {
+                "city1": row["city1"].strip(),
+                "city2": row["city2"].strip(),
+                "driving_time_seconds": int(round(seconds)),
+                "driving_time_human": row.get("driving_time_human") or dbcache.format_duration(seconds),
+                "distance_km_road": float(row["distance_km_road"]),
+                "distance_km_air": float(row.get("distance_km_air") or 0.0),
+            }
+
+
+def import_matrix(path: str, batch_size: int) -> None:
+    started = time.perf_counter()
+    total = 0
+    batch: List[Dict] = []
+
+    for record in _matrix_records(path):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            total += dbcache.save_mcp_records_bulk(batch)
+            batch = []
+    total += dbcache.save_mcp_records_bulk(batch)
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"[IMPORT] {total} dvojíc za {elapsed:.1f} s "
+        f"({total / elapsed if elapsed else 0:.0f} dvojíc/s)."
+    )
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Správa cache vzdialeností (distances.db).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_prewarm = sub.add_parser("prewarm", help="Predpočíta dvojice cez MCP server.")
+    p_prewarm.add_argument("--cities", help="CSV miest – predpočítajú sa všetky dvojice.")
+    p_prewarm.add_argument("--origins", help="CSV východzích miest.")
+    p_prewarm.add_argument("--destinations", help="CSV cieľových miest.")
+    p_prewarm.add_argument("--from-gazetteer", action="store_true", help="Všetky mestá z gazetteer.csv.")
+    p_prewarm.add_argument("--min-population", type=int, default=0, help="Iba mestá z gazetteera nad N obyvateľov.")
+    p_prewarm.add_argument("--batch-size", type=int, default=50, help="Cieľov na jednu dávku.")
+
+    p_import = sub.add_parser("import-matrix", help="Importuje predpočítanú maticu z CSV.")
+    p_import.add_argument("path", help="CSV so stĺpcami city1, city2, distance_km_road, driving_time_seconds.")
+    p_import.add_argument("--batch-size", type=int, default=5000, help="Riadkov na jednu transakciu.")
+
+    p_failures = sub.add_parser("failures", help="Negatívna cache zlyhaných miest/trás.")
+    p_failures.add_argument("action", choices=["list", "clear"])
+    p_failures.add_argument("--city", help="Iba záznamy s týmto mestom (pre clear).")
+
+    p_llm = sub.add_parser("llm-cache", help="Cache LLM zoznamov kandidátskych miest.")
+    p_llm.add_argument("action", choices=["clear"])
+    p_llm.add_argument("--city", help="Iba pre toto východzie mesto.")
+
+    p_alias = sub.add_parser("alias", help="Aliasy miest (rôzne zápisy toho istého mesta).")
+    p_alias.add_argument("action", choices=["add", "list"])
+    p_alias.add_argument("alias", nargs="?", help="Alternatívny zápis mesta (pre add).")
+    p_alias.add_argument("city", nargs="?", help="Kanonické mesto (pre add).")
+
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    dbcache.init_db()
+
+    if args.command == "import-matrix":
+        import_matrix(args.path, args.batch_size)
+        return
+
+    if args.command == "failures":
+        if args.action == "clear":
+            removed = dbcache.clear_failures(args.city)
+            print(f"[FAILURES] Zmazaných {removed} záznamov.")
+            return
+        for item in dbcache.list_failures():
+            pair = item["city2"] if not item["city1"] else f"{item['city1']} ↔ {item['city2']}"
+            print(f"{item['created_at']}  {item['kind']:<8} {pair}: {item['reason']}")
+        return
+
+    if args.command == "llm-cache":
+        removed = dbcache.clear_city_lists(args.city)
+        print(f"[LLM CACHE] Zmazaných {removed} záznamov.")
+        return
+
+    if args.command == "alias":
+        if args.action == "add":
+            if not args.alias or not args.city:
+                raise SystemExit("Použitie: alias add <alias> <mesto>")
+            dbcache.add_city_alias(args.alias, args.city)
+            print(f"[ALIAS] {args.alias} -> {dbcache.resolve_city_key(args.city)}")
+            return
+        for alias, canonical in sorted(dbcache.list_city_aliases().items()):
+            print(f"{alias} -> {canonical}")
+        return
+
+    if args.from_gazetteer:
+        origins = destinations = [
+            place.name
+            for place in get_gazetteer().places
+            if place.population >= args.min_population
+        ]
+    elif args.cities:
+        origins = destinations = _read_city_csv(args.cities)
+    elif args.origins and args.destinations:
+        origins = _read_city_csv(args.origins)
+        destinations = _read_city_csv(args.destinations)
+    else:
+        raise SystemExit("Zadaj --cities, --from-gazetteer alebo --origins spolu s --destinations.")
+
+    try:
+        asyncio.run(prewarm(origins, destinations, args.batch_size))
+    except KeyboardInterrupt:
+        print("\n[PREWARM] Prerušené – hotové dávky sú uložené, ďalšie spustenie pokračuje.")
+
+
+if __name__ == "__main__":
+    main()
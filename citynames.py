@@ -0,0 +1,83 @@
+# citynames.py
+"""
+Kanonická identita miest – spoločná pre dbcache, MCP server (geocode cache)
+aj MapService.
+
+"Trenčín", "Trencin", "trenčín " aj "Trenčín (SK)" -> "trencin".
+Okrem toho sa kľúč preloží cez tabuľku aliasov (vstavané + city_aliases v DB),
+takže rôzne LLM zápisy toho istého mesta zdieľajú jeden cache záznam.
+"""
+import re
+import sqlite3
+import unicodedata
+from typing import Dict, Mapping, Optional
+
+# vstavané aliasy (kanonický kľúč -> kanonický kľúč)
+BUILTIN_ALIASES: Dict[str, str] = {
+    "presporok": "bratislava",
+    "pressburg": "bratislava",
+    "pozsony": "bratislava",
+    "kassa": "kosice",
+    "kaschau": "kosice",
+    "vienna": "wien",
+    "viden": "wien",
+    "vieden": "wien",
+    "prague": "praha",
+}
+
+ALIAS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS city_aliases (
+        alias_key TEXT PRIMARY KEY,
+        canonical_key TEXT NOT NULL
+    );
+"""
+
+_PARENS = re.compile(r"\([^)]*\)")
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def fold(name: str) -> str:
+    """
+    Normalizuje zápis mesta: bez diakritiky, malé písmená, bez prípon v zátvorkách
+    ("Brno (CZ)") a za čiarkou ("Brno, Česko"), interpunkcia -> medzera.
+    """
+    text = name.split(",", 1)[0]
+    text = _PARENS.sub(" ", text)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _NON_WORD.sub(" ", text.casefold())
+    return " ".join(text.split())
+
+
+def canonical_key(name: str, aliases: Optional[Mapping[str, str]] = None) -> str:
+    """
+    Kanonický kľúč mesta – fold() + preklad cez aliasy (DB aliasy majú prednosť).
+    """
+    key = fold(name)
+    if aliases and key in aliases:
+        return aliases[key]
+    return BUILTIN_ALIASES.get(key, key)
+
+
+def geocode_query(name: str) -> str:
+    """
+    Dotaz pre geokodér: "Brno (CZ)" -> "Brno, CZ" (prípona ako krajina).
+    """
+    name = name.strip()
+    match = _PARENS.search(name)
+    if not match:
+        return name
+    base = _PARENS.sub(" ", name)
+    suffix = match.group(0)[1:-1].strip()
+    base = " ".join(base.split())
+    return f"{base}, {suffix}" if suffix else base
+
+
+def ensure_alias_table(conn: sqlite3.Connection) -> None:
+    conn.execute(ALIAS_TABLE_SQL)
+
+
+def load_aliases(conn: sqlite3.Connection) -> Dict[str, str]:
+    """Načíta aliasy z DB (alias_key -> canonical_key)."""
+    rows = conn.execute("SELECT alias_key, canonical_key FROM city_aliases").fetchall()
+    return {alias: canonical for alias, canonical in rows}
@@ -6,6 +6,10 @@ from mcp import StdioServerParameters
 load_dotenv()
 
 MODEL_NAME = "gpt-4o"
+# zdieľaný HTTP pool pre LLM klientov (llm_clients)
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_KEEPALIVE_CONNECTIONS", "10"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
 
 # MCP server – cesta k server.py
 BASE_DIR = os.path.dirname(__file__)
@@ -18,3 +22,80 @@ SERVER_PARAMS = StdioServerParameters(
     args=[SERVER_SCRIPT_PATH],
     env=None,
 )
+
+# MCP session pool (FastAPI lifespan) – počet teplých server.py procesov
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+# ako často (s) pingovať voľné session a po akom čase (s) ping považovať za zlyhaný
+MCP_HEALTH_INTERVAL = float(os.getenv("MCP_HEALTH_INTERVAL", "30"))
+MCP_PING_TIMEOUT = float(os.getenv("MCP_PING_TIMEOUT", "5"))
+# max. čakanie (s) na voľnú session z poolu
+MCP_ACQUIRE_TIMEOUT = float(os.getenv("MCP_ACQUIRE_TIMEOUT", "30"))
+
+# paralelné MCP volania v get_map_data_from_mcp
+MCP_CONCURRENCY = int(os.getenv("MCP_CONCURRENCY", "4"))
+# timeout (s) jedného MCP volania
+MCP_CALL_TIMEOUT = float(os.getenv("MCP_CALL_TIMEOUT", "60"))
+# počet cieľov v jednom volaní driving_matrix
+MCP_BATCH_SIZE = int(os.getenv("MCP_BATCH_SIZE", "5"))
+
+# background refresh starých trás (stale-while-revalidate)
+REFRESH_ENABLED = os.getenv("REFRESH_ENABLED", "1") == "1"
+# trasy staršie ako N dní sa prepočítajú
+REFRESH_MAX_AGE_DAYS = float(os.getenv("REFRESH_MAX_AGE_DAYS", "90"))
+# ako často (s) hľadať staré trasy a koľko ich spracovať naraz
+REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL", "600"))
+REFRESH_BATCH_SIZE = int(os.getenv("REFRESH_BATCH_SIZE", "50"))
+# min. pauza (s) medzi MCP volaniami refreshera – nezahltiť OSRM/Nominatim
+REFRESH_MIN_DELAY = float(os.getenv("REFRESH_MIN_DELAY", "5"))
+
+# fronta jobov pre /generate (jobs.py)
+# počet súbežne bežiacich run_logbook
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# max. čakajúcich jobov – ďalšie sa odmietnu s HTTP 503
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "20"))
+# ako dlho (s) si pamätať hotový job (stav, priebeh)
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", "3600"))
+
+# úložisko výsledkov (result_store.py): "sqlite" = zdieľané medzi uvicorn workermi,
+# "memory" = iba v procese
+RESULT_STORE_BACKEND = os.getenv("RESULT_STORE_BACKEND", "sqlite")
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", os.path.join(BASE_DIR, "results.db"))
+RESULT_STORE_MAX_ENTRIES = int(os.getenv("RESULT_STORE_MAX_ENTRIES", "1000"))
+RESULT_STORE_MAX_MB = float(os.getenv("RESULT_STORE_MAX_MB", "200"))
+# výsledky staršie ako N sekúnd sa zahodia (0 = bez TTL)
+RESULT_STORE_TTL_SECONDS = float(os.getenv("RESULT_STORE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# zdroj kandidátskych miest: "gazetteer" (offline, gazetteer.csv) alebo "llm"
+CANDIDATE_SOURCE = os.getenv("CANDIDATE_SOURCE", "gazetteer")
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(BASE_DIR, "gazetteer.csv"))
+# okruh (km), min. počet obyvateľov a počet vybraných miest
+GAZETTEER_RADIUS_KM = float(os.getenv("GAZETTEER_RADIUS_KM", "300"))
+GAZETTEER_MIN_POPULATION = int(os.getenv("GAZETTEER_MIN_POPULATION", "5000"))
+GAZETTEER_CANDIDATES = int(os.getenv("GAZETTEER_CANDIDATES", "10"))
+# mestá, ktoré sú vo výbere vždy (ak sú v okruhu) – čiarkou oddelené
+GAZETTEER_ALWAYS_INCLUDE = [
+    c.strip() for c in os.getenv("GAZETTEER_ALWAYS_INCLUDE", "Bratislava").split(",") if c.strip()
+]
+
+# prefilter kandidátov podľa vzdušnej vzdialenosti (pred volaním OSRM)
+PREFILTER_ENABLED = os.getenv("PREFILTER_ENABLED", "1") == "1"
+# kandidáti bližšie ako N km (odhad jedným smerom) sa vyradia
+PREFILTER_MIN_KM = float(os.getenv("PREFILTER_MIN_KM", "5"))
+# "routed" = plánuje sa nad reálnymi trasami všetkých kandidátov,
+# "estimate" = plánuje sa nad odhadmi a routujú sa iba mestá použité v pláne
+PLANNING_MODE = os.getenv("PLANNING_MODE", "routed")
+# kalibrácia odhadu road/air z uložených dvojíc
+DETOUR_DEFAULT = float(os.getenv("DETOUR_DEFAULT", "1.3"))
+DETOUR_DEFAULT_KMH = float(os.getenv("DETOUR_DEFAULT_KMH", "70"))
+DETOUR_MIN_SAMPLES = int(os.getenv("DETOUR_MIN_SAMPLES", "20"))
+DETOUR_MAX_SAMPLES = int(os.getenv("DETOUR_MAX_SAMPLES", "5000"))
+DETOUR_RECALIBRATE_SECONDS = float(os.getenv("DETOUR_RECALIBRATE_SECONDS", "3600"))
+
+# cache zoznamov kandidátskych miest z LLM (distances.db) – TTL v dňoch (0 = bez TTL)
+LLM_CITY_CACHE_TTL_DAYS = float(os.getenv("LLM_CITY_CACHE_TTL_DAYS", "30"))
+
+# plánovač jázd: "llm" (GPT, pestrejšie plány), "speculative" (k paralelných LLM volaní,
+# najlepší plán) alebo "solver" (deterministický, milisekundy)
+PLANNER = os.getenv("PLANNER", "llm")
+# počet súbežných LLM volaní v režime speculative
+SPECULATIVE_K = int(os.getenv("SPECULATIVE_K", "3"))
@@ -1,39 +1,495 @@
 # dbcache.py
+import os
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 import json
 
+from citynames import canonical_key, ensure_alias_table, fold, load_aliases
+
 DB_PATH = Path(__file__).resolve().parent / "distances.db"
 
+# max. počet dvojíc v jednom SQL dotaze (limit SQLite na počet parametrov)
+_BULK_CHUNK = 400
+
+# in-memory LRU pred SQLite: max. počet dvojíc a TTL (s) od vloženia do LRU (0 = bez TTL)
+DISTANCE_CACHE_SIZE = int(os.getenv("DISTANCE_CACHE_SIZE", "5000"))
+DISTANCE_CACHE_TTL = float(os.getenv("DISTANCE_CACHE_TTL", str(30 * 24 * 3600)))
+
+# negatívna cache: TTL (s) pre trvalé zlyhania (mesto/trasa neexistuje)
+# a kratší TTL pre dočasné chyby (timeout, výpadok služby)
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", str(24 * 3600)))
+NEGATIVE_CACHE_TRANSIENT_TTL = float(os.getenv("NEGATIVE_CACHE_TRANSIENT_TTL", "600"))
+
+# aliasy miest z DB sa v procese cachujú a obnovujú po N sekundách
+ALIAS_RELOAD_SECONDS = 60.0
+
+# verzia schémy (PRAGMA user_version) – 1 = kanonické kľúče miest (citynames),
+# 2 = cities + kompaktná city_pairs (WITHOUT ROWID)
+SCHEMA_VERSION = 2
+
+# ukladať aj celý MCP JSON ku každej dvojici (iba na debug – zväčšuje DB)
+STORE_RAW_JSON = os.getenv("STORE_RAW_JSON", "0") == "1"
+
+# jedno spojenie na vlákno – znovupoužité medzi volaniami
+_local = threading.local()
+
+_aliases: Dict[str, str] = {}
+_aliases_loaded_at = 0.0
+_aliases_lock = threading.Lock()
+
+
+class DistanceLRU:
+    """
+    Ohraničená in-memory LRU cache dvojíc miest (kanonický kľúč) pred SQLite.
+
+    Hodnota: (distance_km_road, driving_time_seconds, cached_at_epoch).
+    Záznam v LRU dlhšie ako `ttl` sekúnd sa považuje za miss a číta sa znova
+    z SQLite. TTL sa meria od vloženia, nie od created_at v DB – staré trasy
+    z DB (import, prewarm, pred obnovou refresherom) sa inak do pamäte nikdy
+    nedostanú. Thread-safe (čítajú ju reader vlákna).
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Tuple[str, str], Tuple[float, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[Tuple[float, int, float]]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            if self.ttl and time.time() - value[2] > self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Tuple[str, str], value: Tuple[float, int, float]) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Tuple[str, str]) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_city(self, city: str) -> int:
+        with self._lock:
+            keys = [k for k in self._data if city in k]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+_lru = DistanceLRU(DISTANCE_CACHE_SIZE, DISTANCE_CACHE_TTL)
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_PATH, timeout=10)
+    # WAL: čitatelia neblokujú zapisovateľa (web app + MCP server nad tým istým súborom)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Vráti perzistentné spojenie pre aktuálne vlákno (vytvorí ho pri prvom použití).
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != DB_PATH:
+        conn = _connect()
+        _local.conn = conn
+        _local.path = DB_PATH
+    return conn
+
 
 def init_db() -> None:
     """
-    Vytvorí tabuľku, ak ešte neexistuje.
-    Ukladá celú štruktúru z MCP (driving_time_* + distance_* + raw_json).
+    Vytvorí tabuľky, ak ešte neexistujú, a zmigruje staršiu schému.
+
+    Mestá sú v tabuľke `cities` (id, kanonický kľúč z citynames, lat, lon),
+    dvojice v kompaktnej WITHOUT ROWID tabuľke `city_pairs` s kľúčom
+    (min_id, max_id) – lookup v oboch smeroch ide priamo cez primárny kľúč.
+    Vzdialenosti sú v celých metroch, created_at v epoch sekundách,
+    raw_json sa ukladá iba pri STORE_RAW_JSON=1.
     """
-    with sqlite3.connect(DB_PATH) as conn:
+    conn = get_connection()
+    with conn:
+        ensure_alias_table(conn)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cities (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                lat REAL,
+                lon REAL
+            );
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS city_pairs (
+                city1_id INTEGER NOT NULL,
+                city2_id INTEGER NOT NULL,
+                driving_time_seconds INTEGER NOT NULL,
+                distance_m_road INTEGER NOT NULL,
+                distance_m_air INTEGER NOT NULL,
+                created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+                raw_json TEXT,
+                PRIMARY KEY (city1_id, city2_id)
+            ) WITHOUT ROWID;
+            """
+        )
+        # negatívna cache – city1 = '' znamená zlyhanie samotného mesta (geokódovanie)
         conn.execute(
             """
-            CREATE TABLE IF NOT EXISTS city_distances (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+            CREATE TABLE IF NOT EXISTS failed_lookups (
                 city1 TEXT NOT NULL,
                 city2 TEXT NOT NULL,
-                driving_time_seconds INTEGER NOT NULL,
-                driving_time_human TEXT NOT NULL,
-                distance_km_road REAL NOT NULL,
-                distance_km_air REAL NOT NULL,
-                raw_json TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                reason TEXT NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(city1, city2)
+                PRIMARY KEY (city1, city2)
+            );
+            """
+        )
+
+        # lease – úlohu (napr. refresh kolo) robí naraz iba jeden proces
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
             );
             """
         )
-        conn.commit()
+
+        # cache odpovedí LLM (zoznam kandidátskych miest) – payload je JSON CityList
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_city_lists (
+                start_key TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+                PRIMARY KEY (start_key, model, prompt_version)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < SCHEMA_VERSION:
+        migrated = version < 2 and _migrate_city_distances(conn)
+        _rekey_cities(conn)
+        with conn:
+            _fill_city_coords(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        if migrated:
+            # uvoľní miesto po starej tabuľke (mimo transakcie)
+            conn.execute("VACUUM")
+
+
+def _migrate_city_distances(conn: sqlite3.Connection) -> bool:
+    """
+    Jednorazová migrácia starej tabuľky city_distances (mená ako TEXT v každom
+    riadku + raw_json) do cities + city_pairs. Vráti True, ak sa migrovalo.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'city_distances'"
+    ).fetchone()
+    if not exists:
+        return False
+
+    started = time.perf_counter()
+    with conn:
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO cities (name)
+            SELECT city1 FROM city_distances
+            UNION
+            SELECT city2 FROM city_distances
+            """
+        )
+        # pri duplicitách (A→B aj B→A) ostane starší záznam
+        cur = conn.execute(
+            """
+            INSERT OR IGNORE INTO city_pairs (
+                city1_id, city2_id, driving_time_seconds,
+                distance_m_road, distance_m_air, created_at, raw_json
+            )
+            SELECT min(a.id, b.id),
+                   max(a.id, b.id),
+                   d.driving_time_seconds,
+                   CAST(round(d.distance_km_road * 1000) AS INTEGER),
+                   CAST(round(d.distance_km_air * 1000) AS INTEGER),
+                   coalesce(CAST(strftime('%s', d.created_at) AS INTEGER), 0),
+                   CASE WHEN ? THEN d.raw_json END
+            FROM city_distances d
+            JOIN cities a ON a.name = d.city1
+            JOIN cities b ON b.name = d.city2
+            ORDER BY d.created_at
+            """,
+            (STORE_RAW_JSON,),
+        )
+        conn.execute("DROP TABLE city_distances")
+
+    print(
+        f"[DB] Migrácia city_distances -> cities/city_pairs: {cur.rowcount} dvojíc "
+        f"za {time.perf_counter() - started:.1f} s."
+    )
+    return True
+
+
+def _merge_city(conn: sqlite3.Connection, old_id: int, new_id: int) -> None:
+    # presunie dvojice mesta old_id pod new_id; pri kolízii ostane starší záznam
+    remap = "CASE {col} WHEN :old THEN :new ELSE {col} END"
+    c1 = remap.format(col="city1_id")
+    c2 = remap.format(col="city2_id")
+    params = {"old": old_id, "new": new_id}
+    conn.execute(
+        f"""
+        INSERT INTO city_pairs (
+            city1_id, city2_id, driving_time_seconds,
+            distance_m_road, distance_m_air, created_at, raw_json
+        )
+        SELECT min({c1}, {c2}), max({c1}, {c2}), driving_time_seconds,
+               distance_m_road, distance_m_air, created_at, raw_json
+        FROM city_pairs
+        WHERE (city1_id = :old OR city2_id = :old)
+          AND city1_id != :new AND city2_id != :new
+        ON CONFLICT (city1_id, city2_id) DO UPDATE SET
+            driving_time_seconds = excluded.driving_time_seconds,
+            distance_m_road = excluded.distance_m_road,
+            distance_m_air = excluded.distance_m_air,
+            created_at = excluded.created_at,
+            raw_json = excluded.raw_json
+        WHERE excluded.created_at < city_pairs.created_at
+        """,
+        params,
+    )
+    conn.execute(
+        "DELETE FROM city_pairs WHERE city1_id = :old OR city2_id = :old", params
+    )
+    conn.execute(
+        """
+        UPDATE cities
+        SET lat = coalesce(lat, (SELECT lat FROM cities WHERE id = :old)),
+            lon = coalesce(lon, (SELECT lon FROM cities WHERE id = :old))
+        WHERE id = :new
+        """,
+        params,
+    )
+    conn.execute("DELETE FROM cities WHERE id = :old", params)
+
+
+def _rekey_cities(conn: sqlite3.Connection) -> None:
+    """
+    Prepíše mená v cities (a kľúče v failed_lookups) na aktuálne kanonické
+    kľúče (vrátane aliasov). Mestá, ktoré sa zlejú do jedného kľúča
+    (napr. "Trenčín" aj "Trencin"), sa spoja – pri kolízii ostane starší záznam.
+    """
+    _reload_aliases(conn)
+    conn.create_function("city_key", 1, resolve_city_key, deterministic=True)
+    with conn:
+        rows = conn.execute("SELECT id, name FROM cities").fetchall()
+        ids = {name: city_id for city_id, name in rows}
+        for city_id, name in rows:
+            key = resolve_city_key(name)
+            if key == name:
+                continue
+            target = ids.get(key)
+            if target is None:
+                conn.execute("UPDATE cities SET name = ? WHERE id = ?", (key, city_id))
+                ids[key] = city_id
+            else:
+                _merge_city(conn, city_id, target)
+            del ids[name]
+
+        keyed = (
+            "min(city_key(city1), city_key(city2)) AS k1, "
+            "max(city_key(city1), city_key(city2)) AS k2"
+        )
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO failed_lookups (city1, city2, kind, reason, created_at)
+            SELECT k1, k2, kind, reason, created_at
+            FROM (SELECT {keyed}, * FROM failed_lookups ORDER BY created_at)
+            WHERE city1 != k1 OR city2 != k2
+            """
+        )
+        conn.execute(
+            """
+            DELETE FROM failed_lookups
+            WHERE city1 != min(city_key(city1), city_key(city2))
+               OR city2 != max(city_key(city1), city_key(city2))
+            """
+        )
+    _lru.clear()
+
+
+def _fill_city_coords(conn: sqlite3.Connection, names: Optional[List[str]] = None) -> None:
+    """
+    Doplní lat/lon do cities z geocode_cache MCP servera (ak je v tej istej DB).
+    Beží v transakcii volajúceho.
+    """
+    has_geocode = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'geocode_cache'"
+    ).fetchone()
+    if not has_geocode:
+        return
+
+    sql = """
+        UPDATE cities
+        SET lat = (SELECT g.lat FROM geocode_cache g WHERE g.city_key = cities.name),
+            lon = (SELECT g.lon FROM geocode_cache g WHERE g.city_key = cities.name)
+        WHERE lat IS NULL
+          AND name IN (SELECT city_key FROM geocode_cache)
+    """
+    if names is None:
+        conn.execute(sql)
+        return
+    placeholders = ", ".join("?" for _ in names)
+    conn.execute(f"{sql} AND name IN ({placeholders})", names)
+
+
+def _reload_aliases(conn: Optional[sqlite3.Connection] = None) -> None:
+    global _aliases, _aliases_loaded_at
+    try:
+        aliases = load_aliases(conn or get_connection())
+    except sqlite3.OperationalError:
+        # tabuľka ešte neexistuje (init_db nebežal)
+        aliases = {}
+    with _aliases_lock:
+        _aliases = aliases
+        _aliases_loaded_at = time.monotonic()
+
+
+def resolve_city_key(name: str) -> str:
+    """
+    Kanonický kľúč mesta: bez diakritiky, prípon a s prekladom cez aliasy.
+    """
+    if time.monotonic() - _aliases_loaded_at > ALIAS_RELOAD_SECONDS:
+        _reload_aliases()
+    return canonical_key(name, _aliases)
+
+
+def add_city_alias(alias: str, canonical: str) -> None:
+    """
+    Zaregistruje alias (napr. LLM preklep) pre mesto a prekľúčuje existujúce záznamy.
+    """
+    alias_key = fold(alias)
+    canonical_id = resolve_city_key(canonical)
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO city_aliases (alias_key, canonical_key) VALUES (?, ?)",
+            (alias_key, canonical_id),
+        )
+    _rekey_cities(conn)
+
+
+def list_city_aliases() -> Dict[str, str]:
+    return load_aliases(get_connection())
 
 
 def _norm(name: str) -> str:
-    return name.strip()
+    return resolve_city_key(name)
+
+
+def _pair_key(city1: str, city2: str) -> Tuple[str, str]:
+    # kanonické poradie dvojice – zhodné s tým, ako je uložená v DB
+    c1 = _norm(city1)
+    c2 = _norm(city2)
+    return (c1, c2) if c1 <= c2 else (c2, c1)
+
+
+def _chunks(items: List[Any], size: int = _BULK_CHUNK) -> Iterable[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def get_city_coords(name: str) -> Optional[Tuple[float, float]]:
+    """Súradnice mesta z tabuľky cities (lat, lon) alebo None."""
+    return get_city_coords_bulk([name]).get(name)
+
+
+def get_city_coords_bulk(names: List[str]) -> Dict[str, Tuple[float, float]]:
+    """{ mesto (ako bolo zadané): (lat, lon) } pre mestá so známymi súradnicami."""
+    keys: Dict[str, List[str]] = {}
+    for name in names:
+        keys.setdefault(_norm(name), []).append(name)
+
+    found: Dict[str, Tuple[float, float]] = {}
+    conn = get_connection()
+    for chunk in _chunks(list(keys)):
+        placeholders = ", ".join("?" for _ in chunk)
+        rows = conn.execute(
+            f"""
+            SELECT name, lat, lon FROM cities
+            WHERE name IN ({placeholders}) AND lat IS NOT NULL
+            """,
+            chunk,
+        ).fetchall()
+        for key, lat, lon in rows:
+            for name in keys[key]:
+                found[name] = (lat, lon)
+    return found
+
+
+def get_air_road_samples(limit: int) -> List[Tuple[int, int, int]]:
+    """
+    Vzorka uložených dvojíc (distance_m_air, distance_m_road, driving_time_seconds)
+    na kalibráciu odhadu cestnej vzdialenosti zo vzdušnej (prefilter).
+    """
+    return get_connection().execute(
+        """
+        SELECT distance_m_air, distance_m_road, driving_time_seconds
+        FROM city_pairs
+        WHERE distance_m_air > 0 AND distance_m_road > 0 AND driving_time_seconds > 0
+        LIMIT ?
+        """,
+        (limit,),
+    ).fetchall()
 
 
 def get_mcp_record(city1: str, city2: str) -> Optional[Dict[str, Any]]:
@@ -47,42 +503,38 @@ def get_mcp_record(city1: str, city2: str) -> Optional[Dict[str, Any]]:
         "driving_time_human": ...,
         "distance_km_road": ...,
         "distance_km_air": ...,
-        "raw_json": "pôvodný JSON string"
+        "raw_json": "pôvodný JSON string" alebo None (STORE_RAW_JSON=0)
     }
     """
-    c1 = _norm(city1)
-    c2 = _norm(city2)
+    c1, c2 = _pair_key(city1, city2)
 
-    with sqlite3.connect(DB_PATH) as conn:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT city1,
-                   city2,
-                   driving_time_seconds,
-                   driving_time_human,
-                   distance_km_road,
-                   distance_km_air,
-                   raw_json
-            FROM city_distances
-            WHERE (city1 = ? AND city2 = ?)
-               OR (city1 = ? AND city2 = ?)
-            """,
-            (c1, c2, c2, c1),
-        )
-        row = cur.fetchone()
+    cur = get_connection().execute(
+        """
+        SELECT p.driving_time_seconds,
+               p.distance_m_road,
+               p.distance_m_air,
+               p.raw_json
+        FROM cities a
+        JOIN cities b ON b.name = ?
+        JOIN city_pairs p
+          ON p.city1_id = min(a.id, b.id) AND p.city2_id = max(a.id, b.id)
+        WHERE a.name = ?
+        """,
+        (c2, c1),
+    )
+    row = cur.fetchone()
 
     if not row:
         return None
 
     return {
-        "city1": row[0],
-        "city2": row[1],
-        "driving_time_seconds": int(row[2]),
-        "driving_time_human": row[3],
-        "distance_km_road": float(row[4]),
-        "distance_km_air": float(row[5]),
-        "raw_json": row[6],
+        "city1": c1,
+        "city2": c2,
+        "driving_time_seconds": int(row[0]),
+        "driving_time_human": format_duration(row[0]),
+        "distance_km_road": row[1] / 1000.0,
+        "distance_km_air": row[2] / 1000.0,
+        "raw_json": row[3],
     }
 
 
@@ -99,6 +551,236 @@ def get_distance_from_db(city1: str, city2: str) -> Optional[Tuple[float, int]]:
     return dist, duration_min
 
 
+def get_distances_bulk(origin: str, cities: List[str]) -> Dict[str, Tuple[float, int]]:
+    """
+    Vyrieši celý zoznam kandidátov – najprv z in-memory LRU, zvyšok jedným
+    indexovaným dotazom do SQLite (výsledky sa uložia do LRU).
+    Vráti { mesto (ako bolo zadané): (distance_km_road, duration_min) } iba pre
+    mestá, ktoré v DB sú.
+    """
+    keys: Dict[Tuple[str, str], List[str]] = {}
+    for city in cities:
+        keys.setdefault(_pair_key(origin, city), []).append(city)
+
+    found: Dict[str, Tuple[float, int]] = {}
+    missing: List[Tuple[str, str]] = []
+    for key, names in keys.items():
+        cached = _lru.get(key)
+        if cached is None:
+            missing.append(key)
+            continue
+        for city in names:
+            found[city] = (float(cached[0]), int(cached[1] // 60))
+
+    conn = get_connection()
+    for chunk in _chunks(missing):
+        values = ", ".join("(?, ?)" for _ in chunk)
+        params = [name for pair in chunk for name in pair]
+        rows = conn.execute(
+            f"""
+            WITH wanted(city1, city2) AS (VALUES {values})
+            SELECT wanted.city1, wanted.city2, p.distance_m_road, p.driving_time_seconds
+            FROM wanted
+            JOIN cities a ON a.name = wanted.city1
+            JOIN cities b ON b.name = wanted.city2
+            JOIN city_pairs p
+              ON p.city1_id = min(a.id, b.id) AND p.city2_id = max(a.id, b.id)
+            """,
+            params,
+        ).fetchall()
+
+        cached_at = time.time()
+        for city1, city2, distance_m_road, driving_time_seconds in rows:
+            distance_km_road = distance_m_road / 1000.0
+            _lru.put(
+                (city1, city2),
+                (distance_km_road, int(driving_time_seconds), cached_at),
+            )
+            for city in keys[(city1, city2)]:
+                found[city] = (distance_km_road, int(driving_time_seconds // 60))
+
+    return found
+
+
+def invalidate_distance(city1: str, city2: Optional[str] = None) -> None:
+    """
+    Zahodí dvojicu (alebo všetky dvojice s daným mestom) z in-memory cache.
+    SQLite sa nemení.
+    """
+    if city2 is None:
+        _lru.invalidate_city(_norm(city1))
+    else:
+        _lru.invalidate(_pair_key(city1, city2))
+
+
+def clear_memory_cache() -> None:
+    _lru.clear()
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Počítadlá in-memory cache (hits, misses, evictions, …)."""
+    return _lru.stats()
+
+
+def format_duration(seconds: float) -> str:
+    # rovnaký formát ako driving_time_human z MCP servera
+    total_minutes = int(round(seconds / 60))
+    hours = total_minutes // 60
+    minutes = total_minutes % 60
+    if hours > 0:
+        return f"{hours} h {minutes} min"
+    return f"{minutes} min"
+
+
+def _city_ids(conn: sqlite3.Connection, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Vráti { kanonický kľúč: id } – chýbajúce mestá vloží do cities.
+    """
+    names = list(dict.fromkeys(names))
+    ids: Dict[str, int] = {}
+    for chunk in _chunks(names):
+        placeholders = ", ".join("?" for _ in chunk)
+        ids.update(
+            conn.execute(f"SELECT name, id FROM cities WHERE name IN ({placeholders})", chunk)
+        )
+        new = [name for name in chunk if name not in ids]
+        if new:
+            conn.executemany("INSERT OR IGNORE INTO cities (name) VALUES (?)", [(n,) for n in new])
+            placeholders = ", ".join("?" for _ in new)
+            ids.update(
+                conn.execute(f"SELECT name, id FROM cities WHERE name IN ({placeholders})", new)
+            )
+            _fill_city_coords(conn, new)
+    return ids
+
+
+def _pair_rows(
+    conn: sqlite3.Connection, records: Iterable[Dict[str, Any]]
+) -> Tuple[List[Tuple[Any, ...]], List[Tuple[str, str]]]:
+    """
+    Prevedie MCP záznamy na riadky city_pairs (min_id, max_id, …).
+    Vráti (riadky, kanonické dvojice mien pre invalidáciu LRU).
+    """
+    keyed = [(_pair_key(str(data["city1"]), str(data["city2"])), data) for data in records]
+    ids = _city_ids(conn, (name for key, _ in keyed for name in key))
+
+    rows: List[Tuple[Any, ...]] = []
+    for (c1, c2), data in keyed:
+        id1, id2 = ids[c1], ids[c2]
+        rows.append(
+            (
+                min(id1, id2),
+                max(id1, id2),
+                int(data["driving_time_seconds"]),
+                int(round(float(data["distance_km_road"]) * 1000)),
+                int(round(float(data.get("distance_km_air", 0.0)) * 1000)),
+                json.dumps(data, ensure_ascii=False) if STORE_RAW_JSON else None,
+            )
+        )
+    return rows, [key for key, _ in keyed]
+
+
+def save_mcp_records_bulk(records: Iterable[Dict[str, Any]]) -> int:
+    """
+    Uloží dávku MCP výsledkov v jednej transakcii (INSERT OR IGNORE).
+    Vráti počet spracovaných záznamov.
+    """
+    records = list(records)
+    if not records:
+        return 0
+
+    conn = get_connection()
+    keys: List[Tuple[str, str]] = []
+    with conn:
+        for chunk in _chunks(records):
+            rows, chunk_keys = _pair_rows(conn, chunk)
+            keys.extend(chunk_keys)
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO city_pairs (
+                    city1_id,
+                    city2_id,
+                    driving_time_seconds,
+                    distance_m_road,
+                    distance_m_air,
+                    raw_json
+                )
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+    for key in keys:
+        _lru.invalidate(key)
+    return len(keys)
+
+
+def update_mcp_records_bulk(records: Iterable[Dict[str, Any]]) -> int:
+    """
+    Prepíše (alebo vloží) dávku MCP výsledkov v jednej transakcii a nastaví
+    created_at na aktuálny čas – používa background refresher.
+    Vráti počet spracovaných záznamov.
+    """
+    records = list(records)
+    if not records:
+        return 0
+
+    conn = get_connection()
+    keys: List[Tuple[str, str]] = []
+    with conn:
+        for chunk in _chunks(records):
+            rows, chunk_keys = _pair_rows(conn, chunk)
+            keys.extend(chunk_keys)
+            conn.executemany(
+                """
+                INSERT INTO city_pairs (
+                    city1_id,
+                    city2_id,
+                    driving_time_seconds,
+                    distance_m_road,
+                    distance_m_air,
+                    raw_json
+                )
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(city1_id, city2_id) DO UPDATE SET
+                    driving_time_seconds = excluded.driving_time_seconds,
+                    distance_m_road = excluded.distance_m_road,
+                    distance_m_air = excluded.distance_m_air,
+                    raw_json = excluded.raw_json,
+                    created_at = CAST(strftime('%s', 'now') AS INTEGER)
+                """,
+                rows,
+            )
+    for key in keys:
+        _lru.invalidate(key)
+    return len(keys)
+
+
+def get_stale_pairs(max_age_seconds: float, limit: int) -> List[Tuple[str, str]]:
+    """
+    Vráti najviac `limit` dvojíc (city1, city2), ktorých created_at je staršie
+    ako `max_age_seconds` – najstaršie ako prvé. Dvojice, ktorých obnova
+    nedávno zlyhala (save_refresh_failures, v rámci NEGATIVE_CACHE_TTL), vynechá.
+    """
+    rows = get_connection().execute(
+        """
+        SELECT a.name, b.name
+        FROM city_pairs p
+        JOIN cities a ON a.id = p.city1_id
+        JOIN cities b ON b.id = p.city2_id
+        WHERE p.created_at < CAST(strftime('%s', 'now') AS INTEGER) - ?
+          AND NOT EXISTS (
+              SELECT 1 FROM failed_lookups f
+              WHERE f.city1 = min(a.name, b.name) AND f.city2 = max(a.name, b.name)
+                AND f.kind = 'refresh' AND f.created_at >= datetime('now', ?)
+          )
+        ORDER BY p.created_at
+        LIMIT ?
+        """,
+        (int(max_age_seconds), f"-{int(NEGATIVE_CACHE_TTL)} seconds", limit),
+    ).fetchall()
+    return [(row[0], row[1]) for row in rows]
+
+
 def save_mcp_record(data: Dict[str, Any]) -> None:
     """
     Uloží MCP výsledok do DB (INSERT OR IGNORE).
@@ -107,38 +789,217 @@ def save_mcp_record(data: Dict[str, Any]) -> None:
       city1, city2, driving_time_seconds, driving_time_human,
       distance_km_road, distance_km_air
     """
-    c1 = _norm(str(data["city1"]))
-    c2 = _norm(str(data["city2"]))
+    save_mcp_records_bulk([data])
+
+
+# --------------------------------------------------------------------
+# Lease – jeden vlastník úlohy naprieč procesmi (refresher v každom uvicorn workeri)
+# --------------------------------------------------------------------
+
+def acquire_lease(name: str, owner: str, ttl_seconds: float) -> bool:
+    """
+    Získa (alebo predĺži) lease `name` pre `owner` na ttl_seconds.
+    Vráti False, ak ho drží iný vlastník a ešte nevypršal.
+    """
+    now = time.time()
+    conn = get_connection()
+    with conn:
+        cur = conn.execute(
+            """
+            INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE
+              SET owner = excluded.owner, expires_at = excluded.expires_at
+              WHERE leases.owner = excluded.owner OR leases.expires_at < ?
+            """,
+            (name, owner, now + ttl_seconds, now),
+        )
+    return cur.rowcount > 0
+
+
+# --------------------------------------------------------------------
+# Cache zoznamov kandidátskych miest z LLM
+# --------------------------------------------------------------------
 
-    driving_time_seconds = int(data["driving_time_seconds"])
-    driving_time_human = str(data.get("driving_time_human", ""))
-    distance_km_road = float(data["distance_km_road"])
-    distance_km_air = float(data.get("distance_km_air", 0.0))
+def get_cached_city_list(
+    start_city: str, model: str, prompt_version: str, max_age_seconds: float
+) -> Optional[str]:
+    """
+    Vráti uložený payload (JSON) pre (kanonické mesto, model, verzia promptu),
+    ak nie je starší ako max_age_seconds (0 = bez TTL). Inak None.
+    """
+    row = get_connection().execute(
+        """
+        SELECT payload FROM llm_city_lists
+        WHERE start_key = ? AND model = ? AND prompt_version = ?
+          AND (? <= 0 OR created_at >= CAST(strftime('%s', 'now') AS INTEGER) - ?)
+        """,
+        (_norm(start_city), model, prompt_version, max_age_seconds, int(max_age_seconds)),
+    ).fetchone()
+    return row[0] if row else None
 
-    raw_json = json.dumps(data, ensure_ascii=False)
 
-    with sqlite3.connect(DB_PATH) as conn:
+def save_city_list(start_city: str, model: str, prompt_version: str, payload: str) -> None:
+    conn = get_connection()
+    with conn:
         conn.execute(
             """
-            INSERT OR IGNORE INTO city_distances (
-                city1,
-                city2,
-                driving_time_seconds,
-                driving_time_human,
-                distance_km_road,
-                distance_km_air,
-                raw_json
+            INSERT OR REPLACE INTO llm_city_lists (start_key, model, prompt_version, payload)
+            VALUES (?, ?, ?, ?)
+            """,
+            (_norm(start_city), model, prompt_version, payload),
+        )
+
+
+def clear_city_lists(start_city: Optional[str] = None) -> int:
+    """Zmaže cache LLM zoznamov – celú, alebo pre jedno východzie mesto."""
+    conn = get_connection()
+    with conn:
+        if start_city is None:
+            cur = conn.execute("DELETE FROM llm_city_lists")
+        else:
+            cur = conn.execute(
+                "DELETE FROM llm_city_lists WHERE start_key = ?", (_norm(start_city),)
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+    return cur.rowcount
+
+
+# --------------------------------------------------------------------
+# Negatívna cache – mestá/trasy, ktoré MCP nevedel vyriešiť
+# --------------------------------------------------------------------
+
+# zlyhania, ktoré nahlásil server pre konkrétne mesto / dvojicu; "transport"
+# (timeout MCP, plný pool, pád servera) sa neukladá – nehovorí nič o meste
+CACHED_FAILURE_KINDS = ("geocode", "origin", "route", "error")
+
+
+def _failure_key(origin: str, city: str, kind: str) -> Tuple[str, str]:
+    # zlyhané geokódovanie platí pre mesto bez ohľadu na východzie mesto
+    if kind == "geocode":
+        return ("", _norm(city))
+    if kind == "origin":
+        return ("", _norm(origin))
+    return _pair_key(origin, city)
+
+
+def save_failures(origin: str, failures: Dict[str, Tuple[str, str]]) -> int:
+    """
+    Uloží zlyhania { mesto: (kind, reason) }.
+    kind: "geocode" | "origin" (nedá sa geokódovať východzie mesto) | "route"
+          | "error" (dočasná chyba servera – kratší TTL).
+    Iné kindy (napr. "transport") sa preskočia.
+    """
+    params = [
+        (*_failure_key(origin, city, kind), kind, reason)
+        for city, (kind, reason) in failures.items()
+        if kind in CACHED_FAILURE_KINDS
+    ]
+    if not params:
+        return 0
+
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO failed_lookups (city1, city2, kind, reason)
+            VALUES (?, ?, ?, ?)
             """,
-            (
-                c1,
-                c2,
-                driving_time_seconds,
-                driving_time_human,
-                distance_km_road,
-                distance_km_air,
-                raw_json,
-            ),
-        )
-        conn.commit()
+            params,
+        )
+    return len(params)
+
+
+def save_refresh_failures(origin: str, failures: Dict[str, str]) -> int:
+    """
+    Uloží { mesto: dôvod } pre dvojice, ktoré refresher nevedel obnoviť
+    (kind "refresh", vždy kľúč dvojice). get_stale_pairs ich počas
+    NEGATIVE_CACHE_TTL vynechá; trasa v city_pairs ostáva platná.
+    """
+    params = [(*_pair_key(origin, city), "refresh", reason) for city, reason in failures.items()]
+    if not params:
+        return 0
+
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO failed_lookups (city1, city2, kind, reason)
+            VALUES (?, ?, ?, ?)
+            """,
+            params,
+        )
+    return len(params)
+
+
+def get_known_failures(origin: str, cities: List[str]) -> Dict[str, str]:
+    """
+    Vráti { mesto: dôvod } pre mestá, ktoré nedávno zlyhali (v rámci TTL) –
+    či už samotné mesto, alebo dvojica s východzím mestom.
+    Ak zlyhalo geokódovanie východzieho mesta, vráti všetky mestá.
+    """
+    wanted: Dict[Tuple[str, str], List[str]] = {}
+    for city in cities:
+        wanted.setdefault(("", _norm(city)), []).append(city)
+        wanted.setdefault(_pair_key(origin, city), []).append(city)
+    origin_key = ("", _norm(origin))
+    wanted.setdefault(origin_key, [])
+
+    known: Dict[str, str] = {}
+    conn = get_connection()
+    for chunk in _chunks(list(wanted)):
+        values = ", ".join("(?, ?)" for _ in chunk)
+        params = [name for pair in chunk for name in pair]
+        rows = conn.execute(
+            f"""
+            WITH wanted(city1, city2) AS (VALUES {values})
+            SELECT f.city1, f.city2, f.reason
+            FROM wanted
+            JOIN failed_lookups f
+              ON f.city1 = wanted.city1 AND f.city2 = wanted.city2
+            WHERE f.created_at >= datetime('now', CASE f.kind WHEN 'error' THEN ? ELSE ? END)
+            """,
+            params
+            + [
+                f"-{int(NEGATIVE_CACHE_TRANSIENT_TTL)} seconds",
+                f"-{int(NEGATIVE_CACHE_TTL)} seconds",
+            ],
+        ).fetchall()
+
+        for city1, city2, reason in rows:
+            if (city1, city2) == origin_key:
+                return {city: f"východzie mesto: {reason}" for city in cities}
+            for city in wanted[(city1, city2)]:
+                known[city] = reason
+
+    return known
+
+
+def list_failures() -> List[Dict[str, Any]]:
+    rows = get_connection().execute(
+        """
+        SELECT city1, city2, kind, reason, created_at
+        FROM failed_lookups
+        ORDER BY created_at DESC
+        """
+    ).fetchall()
+    return [
+        {"city1": r[0], "city2": r[1], "kind": r[2], "reason": r[3], "created_at": r[4]}
+        for r in rows
+    ]
+
+
+def clear_failures(city: Optional[str] = None) -> int:
+    """
+    Zmaže negatívnu cache – celú, alebo iba záznamy s daným mestom.
+    Vráti počet zmazaných riadkov.
+    """
+    conn = get_connection()
+    with conn:
+        if city is None:
+            cur = conn.execute("DELETE FROM failed_lookups")
+        else:
+            c = _norm(city)
+            cur = conn.execute(
+                "DELETE FROM failed_lookups WHERE city1 = ? OR city2 = ?",
+                (c, c),
+            )
+    return cur.rowcount
@@ -0,0 +1,121 @@
+# dbcache_async.py
+"""
+Async fasáda nad dbcache pre FastAPI event loop.
+
+- čítania bežia v pooli vlákien (každé vlákno má vlastné WAL spojenie),
+  takže súbežné requesty čítajú paralelne,
+- zápisy idú cez jedno dedikované writer vlákno s frontou – sú serializované
+  a event loop na ne nečaká blokujúco.
+"""
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import dbcache
+
+
+class AsyncDistanceCache:
+    def __init__(self, readers: int = 4):
+        self._readers = ThreadPoolExecutor(
+            max_workers=readers, thread_name_prefix="dbcache-reader"
+        )
+        self._writes: "queue.Queue[Tuple[Callable[..., Any], tuple, Future] | None]" = queue.Queue()
+        self._writer: threading.Thread | None = None
+        self._writer_lock = threading.Lock()
+
+    # --- writer vlákno ---
+
+    def _ensure_writer(self) -> None:
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._writer_loop, name="dbcache-writer", daemon=True
+                )
+                self._writer.start()
+
+    def _writer_loop(self) -> None:
+        while True:
+            item = self._writes.get()
+            if item is None:
+                break
+            fn, args, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def _submit_write(self, fn: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+        self._ensure_writer()
+        future: Future = Future()
+        self._writes.put((fn, args, future))
+        return asyncio.wrap_future(future)
+
+    # --- verejné API ---
+
+    async def run_read(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Ľubovoľná funkcia, ktorá číta z dbcache (napr. prefilter), v reader pooli."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, fn, *args)
+
+    async def get_distances_bulk(self, origin: str, cities: List[str]) -> Dict[str, Tuple[float, int]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._readers, dbcache.get_distances_bulk, origin, cities
+        )
+
+    async def save_mcp_records_bulk(self, records: Iterable[Dict[str, Any]]) -> int:
+        return await self._submit_write(dbcache.save_mcp_records_bulk, list(records))
+
+    async def update_mcp_records_bulk(self, records: Iterable[Dict[str, Any]]) -> int:
+        return await self._submit_write(dbcache.update_mcp_records_bulk, list(records))
+
+    async def get_stale_pairs(self, max_age_seconds: float, limit: int) -> List[Tuple[str, str]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._readers, dbcache.get_stale_pairs, max_age_seconds, limit
+        )
+
+    async def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        return await self._submit_write(dbcache.acquire_lease, name, owner, ttl_seconds)
+
+    async def save_refresh_failures(self, origin: str, failures: Dict[str, str]) -> int:
+        return await self._submit_write(dbcache.save_refresh_failures, origin, dict(failures))
+
+    async def get_known_failures(self, origin: str, cities: List[str]) -> Dict[str, str]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._readers, dbcache.get_known_failures, origin, cities
+        )
+
+    async def save_failures(self, origin: str, failures: Dict[str, Tuple[str, str]]) -> int:
+        return await self._submit_write(dbcache.save_failures, origin, dict(failures))
+
+    async def get_cached_city_list(
+        self, start_city: str, model: str, prompt_version: str, max_age_seconds: float
+    ) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._readers,
+            dbcache.get_cached_city_list,
+            start_city,
+            model,
+            prompt_version,
+            max_age_seconds,
+        )
+
+    async def save_city_list(self, start_city: str, model: str, prompt_version: str, payload: str) -> None:
+        await self._submit_write(dbcache.save_city_list, start_city, model, prompt_version, payload)
+
+    def close(self) -> None:
+        """Dokončí rozpracované zápisy a zastaví vlákna."""
+        if self._writer is not None and self._writer.is_alive():
+            self._writes.put(None)
+            self._writer.join()
+        self._readers.shutdown(wait=True)
+
+
+distance_cache = AsyncDistanceCache()
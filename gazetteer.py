@@ -0,0 +1,252 @@
+# gazetteer.py
+"""
+Offline gazetteer miest (názov, počet obyvateľov, lat/lon) – zdroj kandidátskych miest.
+
+Otázka "mestá nad 5000 obyvateľov v okruhu ~300 km" je priestorový dotaz:
+mestá z gazetteer.csv sú v mriežkovom indexe (bunky cell_deg × cell_deg stupňov),
+dotaz prejde iba bunky v bounding boxe kruhu. Bez siete, v mikrosekundách.
+LLM (llm_cities) ostáva ako alternatívny zdroj – CANDIDATE_SOURCE=llm.
+"""
+import csv
+import math
+import random
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from citynames import canonical_key
+from config import (
+    CANDIDATE_SOURCE,
+    GAZETTEER_PATH,
+    GAZETTEER_RADIUS_KM,
+    GAZETTEER_MIN_POPULATION,
+    GAZETTEER_CANDIDATES,
+    GAZETTEER_ALWAYS_INCLUDE,
+)
+
+EARTH_RADIUS_KM = 6371.0088
+# km na jeden stupeň zemepisnej šírky
+KM_PER_DEG = 111.2
+
+
+class Place(NamedTuple):
+    name: str
+    population: int
+    lat: float
+    lon: float
+    country: str
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Vzdušná vzdialenosť dvoch bodov v km."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class Gazetteer:
+    def __init__(self, places: Iterable[Place], cell_deg: float = 0.5):
+        self.places: List[Place] = list(places)
+        self.cell_deg = cell_deg
+        self._grid: Dict[Tuple[int, int], List[Place]] = {}
+        self._by_key: Dict[str, Place] = {}
+        for place in self.places:
+            self._grid.setdefault(self._cell(place.lat, place.lon), []).append(place)
+            self._by_key.setdefault(canonical_key(place.name), place)
+
+    @classmethod
+    def from_csv(cls, path: Path, cell_deg: float = 0.5) -> "Gazetteer":
+        """CSV so stĺpcami name, population, lat, lon[, country]."""
+        with open(path, newline="", encoding="utf-8") as f:
+            places = [
+                Place(
+                    name=row["name"].strip(),
+                    population=int(row["population"]),
+                    lat=float(row["lat"]),
+                    lon=float(row["lon"]),
+                    country=(row.get("country") or "").strip(),
+                )
+                for row in csv.DictReader(f)
+            ]
+        return cls(places, cell_deg)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def locate(self, name: str) -> Optional[Place]:
+        """Nájde mesto podľa kanonického kľúča ("Trencin" == "Trenčín")."""
+        return self._by_key.get(canonical_key(name))
+
+    def within(
+        self,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        min_population: int = 0,
+    ) -> List[Tuple[Place, float]]:
+        """
+        Mestá v okruhu radius_km s aspoň min_population obyvateľmi,
+        zoradené podľa vzdialenosti: [(Place, km), ...].
+        """
+        dlat = radius_km / KM_PER_DEG
+        dlon = radius_km / (KM_PER_DEG * max(math.cos(math.radians(lat)), 0.01))
+        lat_lo, lon_lo = self._cell(lat - dlat, lon - dlon)
+        lat_hi, lon_hi = self._cell(lat + dlat, lon + dlon)
+
+        found: List[Tuple[Place, float]] = []
+        for i in range(lat_lo, lat_hi + 1):
+            for j in range(lon_lo, lon_hi + 1):
+                for place in self._grid.get((i, j), ()):
+                    if place.population < min_population:
+                        continue
+                    km = haversine_km(lat, lon, place.lat, place.lon)
+                    if km <= radius_km:
+                        found.append((place, km))
+
+        found.sort(key=lambda item: item[1])
+        return found
+
+
+def sample_diverse(
+    candidates: Sequence[Tuple[Place, float]],
+    count: int,
+    radius_km: float,
+    rng: Optional[random.Random] = None,
+    always: Sequence[Place] = (),
+) -> List[Place]:
+    """
+    Vyberie `count` miest rozložených cez vzdialenostné pásma (krátke aj dlhé
+    trasy). Pásma sa striedajú dokola, v rámci pásma sa losuje s váhou
+    sqrt(počet obyvateľov). Mestá z `always` sú vo výbere vždy.
+    """
+    rng = rng or random.Random()
+    picked: List[Place] = [place for place in always][:count]
+    if count <= 0:
+        return picked
+
+    bands: List[List[Place]] = [[] for _ in range(count)]
+    for place, km in candidates:
+        if place in picked:
+            continue
+        band = min(int(km / radius_km * count), count - 1) if radius_km > 0 else 0
+        bands[band].append(place)
+
+    while len(picked) < count and any(bands):
+        for band in bands:
+            if not band or len(picked) >= count:
+                continue
+            weights = [math.sqrt(place.population) for place in band]
+            place = rng.choices(band, weights=weights)[0]
+            band.remove(place)
+            picked.append(place)
+
+    return picked
+
+
+_gazetteer: Optional[Gazetteer] = None
+
+
+def get_gazetteer() -> Gazetteer:
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer.from_csv(Path(GAZETTEER_PATH))
+    return _gazetteer
+
+
+def _start_coords(start_city: str) -> Tuple[float, float]:
+    place = get_gazetteer().locate(start_city)
+    if place:
+        return place.lat, place.lon
+
+    # menšie obce – súradnice z distances.db (geocode cache MCP servera)
+    import dbcache
+
+    coords = dbcache.get_city_coords(start_city)
+    if coords:
+        return coords
+    raise ValueError(f"Mesto {start_city!r} nie je v gazetteeri ani v distances.db.")
+
+
+def get_candidate_cities_from_gazetteer(
+    start_city: str,
+    count: int = GAZETTEER_CANDIDATES,
+    radius_km: float = GAZETTEER_RADIUS_KM,
+    min_population: int = GAZETTEER_MIN_POPULATION,
+    seed: Optional[int] = None,
+) -> List[str]:
+    """
+    Offline náhrada za get_candidate_cities_from_llm – `count` miest nad
+    min_population obyvateľov v okruhu radius_km, rozložených od krátkych
+    po dlhé trasy. Bez seed je výber pre dané mesto deterministický.
+    """
+    lat, lon = _start_coords(start_city)
+    gazetteer = get_gazetteer()
+    start_key = canonical_key(start_city)
+
+    candidates = [
+        (place, km)
+        for place, km in gazetteer.within(lat, lon, radius_km, min_population)
+        if canonical_key(place.name) != start_key
+    ]
+    in_radius = {place for place, _ in candidates}
+    always = [
+        place
+        for place in (gazetteer.locate(name) for name in GAZETTEER_ALWAYS_INCLUDE)
+        if place in in_radius
+    ]
+
+    rng = random.Random(seed if seed is not None else start_key)
+    cities = [place.name for place in sample_diverse(candidates, count, radius_km, rng, always)]
+    print(f"[GAZETTEER] Kandidátske mestá pre {start_city}: {cities}")
+    return cities
+
+
+def get_candidate_cities(
+    start_city: str,
+    source: Optional[str] = None,
+    force_refresh: bool = False,
+) -> List[str]:
+    """
+    Kandidátske mestá z vybraného zdroja: "gazetteer" (default, offline)
+    alebo "llm". Ak gazetteer východzie mesto nepozná, použije sa LLM.
+    force_refresh obíde cache LLM odpovedí.
+    """
+    source = (source or CANDIDATE_SOURCE).lower()
+    if source == "gazetteer":
+        try:
+            return get_candidate_cities_from_gazetteer(start_city)
+        except ValueError as e:
+            print(f"[GAZETTEER] {e} Použijem LLM.")
+    elif source != "llm":
+        raise ValueError(f"Neznámy zdroj kandidátskych miest: {source!r} (gazetteer | llm)")
+
+    from llm_cities import get_candidate_cities_from_llm
+
+    return get_candidate_cities_from_llm(start_city, force_refresh=force_refresh)
+
+
+async def aget_candidate_cities(
+    start_city: str,
+    source: Optional[str] = None,
+    force_refresh: bool = False,
+) -> List[str]:
+    """
+    Async verzia get_candidate_cities – gazetteer beží v reader pooli
+    (súradnice menších obcí číta z distances.db), LLM cez ainvoke.
+    """
+    from dbcache_async import distance_cache
+
+    source = (source or CANDIDATE_SOURCE).lower()
+    if source == "gazetteer":
+        try:
+            return await distance_cache.run_read(get_candidate_cities_from_gazetteer, start_city)
+        except ValueError as e:
+            print(f"[GAZETTEER] {e} Použijem LLM.")
+    elif source != "llm":
+        raise ValueError(f"Neznámy zdroj kandidátskych miest: {source!r} (gazetteer | llm)")
+
+    from llm_cities import aget_candidate_cities_from_llm
+
+    return await aget_candidate_cities_from_llm(start_city, force_refresh=force_refresh)
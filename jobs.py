@@ -0,0 +1,170 @@
+# jobs.py
+"""
+Fronta úloh na pozadí pre /generate.
+
+POST /generate iba založí job a hneď vráti job_id; beh run_logbook
+(LLM + MCP + LangGraph, 10–40 s) obslúži pevný počet workerov. Fronta
+čakajúcich jobov je ohraničená (JOB_MAX_PENDING) – pri plnej fronte sa
+nový job odmietne (QueueFull -> HTTP 503), takže nával requestov nespustí
+neobmedzene veľa súbežných LLM behov.
+
+Priebeh (kandidátske mestá, mapové dáta, uzly grafu) sa zapisuje do
+job.events; /jobs/{id}/events ho streamuje ako SSE.
+"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from config import JOB_WORKERS, JOB_MAX_PENDING, JOB_TTL_SECONDS
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    """Fronta jobov je plná – klient to má skúsiť neskôr."""
+
+
+class Job:
+    def __init__(self, runner: Callable[["Job"], Awaitable[Any]], params: Dict[str, Any]):
+        self.id = str(uuid4())
+        self.runner = runner
+        self.params = params
+        self.status = QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: List[Dict[str, Any]] = []
+        # nastaví sa pri každej zmene; čakajúci si drží referenciu na starý Event
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def report(self, stage: str, detail: str = "") -> None:
+        """Zapíše krok priebehu a zobudí SSE odberateľov."""
+        self.events.append({"stage": stage, "detail": detail, "at": round(time.time() - self.created_at, 2)})
+        self._notify()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def _set_status(self, status: str) -> None:
+        self.status = status
+        self.report(status, self.error or "")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.events[-1] if self.events else None,
+        }
+
+    async def follow(self, keepalive: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Udalosti od začiatku až po koniec jobu; None = keep-alive
+        (nič nové za `keepalive` sekúnd).
+        """
+        index = 0
+        while True:
+            changed = self._changed
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.finished:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield None
+
+
+class JobQueue:
+    def __init__(self, workers: int = 2, max_pending: int = 20, ttl_seconds: float = 3600):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: Dict[str, Job] = {}
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        print(f"[JOBS] Štartujem {self.workers} workerov (max. {self.max_pending} čakajúcich jobov).")
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, runner: Callable[[Job], Awaitable[Any]], **params: Any) -> Job:
+        """Zaradí job do fronty; pri plnej fronte vyhodí QueueFull."""
+        if self._queue is None:
+            raise RuntimeError("JobQueue nie je spustená (start()).")
+        self._prune()
+        job = Job(runner, params)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFull(f"Vo fronte je už {self.max_pending} jobov.") from None
+        self._jobs[job.id] = job
+        job.report(QUEUED, f"pred ním {self._queue.qsize() - 1} jobov")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _prune(self) -> None:
+        # hotové joby staršie ako TTL zahodíme (výsledky sú v result_store)
+        cutoff = time.time() - self.ttl_seconds
+        for job_id in [
+            job.id for job in self._jobs.values() if job.finished and job.finished_at < cutoff
+        ]:
+            del self._jobs[job_id]
+
+    async def _worker(self) -> None:
+        while True:
+            job: Job = await self._queue.get()
+            job.started_at = time.time()
+            job._set_status(RUNNING)
+            try:
+                job.result = await job.runner(job)
+                job.finished_at = time.time()
+                job._set_status(DONE)
+            except asyncio.CancelledError:
+                job.error = "Server sa vypína."
+                job.finished_at = time.time()
+                job._set_status(FAILED)
+                raise
+            except Exception as e:
+                print(f"[JOBS] Job {job.id} zlyhal: {e}")
+                job.error = str(e)
+                job.finished_at = time.time()
+                job._set_status(FAILED)
+            finally:
+                self._queue.task_done()
+
+
+job_queue = JobQueue(workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING, ttl_seconds=JOB_TTL_SECONDS)
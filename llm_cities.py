@@ -1,19 +1,73 @@
-from typing import List
+import sqlite3
+from typing import List, Optional
 
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
 
-from config import MODEL_NAME
+import dbcache
+from dbcache_async import distance_cache
+from llm_clients import shared_chat_model
+from config import MODEL_NAME, LLM_CITY_CACHE_TTL_DAYS
 from models import CityList
 
+# verzia promptu – pri zmene promptu zvýš, staré odpovede v cache sa prestanú používať
+PROMPT_VERSION = "1"
 
-def get_candidate_cities_from_llm(start_city: str) -> List[str]:
-    """
-    Zavolá LLM a vráti zoznam 10 miest nad 5000 obyvateľov
-    v okruhu cca 300 km od východzieho mesta.
-    """
-    print(f"--- LLM: HĽADANIE MIEST OKOLO {start_city} ---")
-    llm = ChatOpenAI(model=MODEL_NAME, temperature=0)
+
+def _parse_cached(payload: Optional[str]) -> Optional[CityList]:
+    if payload is None:
+        return None
+    try:
+        return CityList.model_validate_json(payload)
+    except ValueError as e:
+        print(f"[LLM CACHE] Neplatný záznam v cache ({e}), volám LLM.")
+        return None
+
+
+def _load_cached(start_city: str) -> Optional[CityList]:
+    try:
+        payload = dbcache.get_cached_city_list(
+            start_city, MODEL_NAME, PROMPT_VERSION, LLM_CITY_CACHE_TTL_DAYS * 24 * 3600
+        )
+    except sqlite3.Error as e:
+        print(f"[LLM CACHE] Chyba čítania cache: {e}")
+        return None
+    return _parse_cached(payload)
+
+
+async def _aload_cached(start_city: str) -> Optional[CityList]:
+    try:
+        payload = await distance_cache.get_cached_city_list(
+            start_city, MODEL_NAME, PROMPT_VERSION, LLM_CITY_CACHE_TTL_DAYS * 24 * 3600
+        )
+    except sqlite3.Error as e:
+        print(f"[LLM CACHE] Chyba čítania cache: {e}")
+        return None
+    return _parse_cached(payload)
+
+
+def _store_cached(start_city: str, response: CityList) -> None:
+    try:
+        dbcache.save_city_list(start_city, MODEL_NAME, PROMPT_VERSION, response.model_dump_json())
+    except sqlite3.Error as e:
+        print(f"[LLM CACHE] Chyba zápisu do cache: {e}")
+
+
+async def _astore_cached(start_city: str, response: CityList) -> None:
+    try:
+        await distance_cache.save_city_list(
+            start_city, MODEL_NAME, PROMPT_VERSION, response.model_dump_json()
+        )
+    except sqlite3.Error as e:
+        print(f"[LLM CACHE] Chyba zápisu do cache: {e}")
+
+
+def _cities(response: CityList) -> List[str]:
+    return [c.strip() for c in response.cities if c.strip()][:10]
+
+
+def _city_chain(start_city: str):
+    """Prompt | LLM so štruktúrovaným výstupom CityList."""
+    llm = shared_chat_model(temperature=0)
 
     system = (
         "Si expert na geografiu Slovenska. Poznáš všetky mestá a obce prioritne na Slovensku. "
@@ -38,9 +92,49 @@ def get_candidate_cities_from_llm(start_city: str) -> List[str]:
     )
 
     structured_llm = llm.with_structured_output(CityList)
-    chain = prompt | structured_llm
-    response: CityList = chain.invoke({})
+    return prompt | structured_llm
+
+
+def get_candidate_cities_from_llm(start_city: str, force_refresh: bool = False) -> List[str]:
+    """
+    Zavolá LLM a vráti zoznam 10 miest nad 5000 obyvateľov
+    v okruhu cca 300 km od východzieho mesta.
+
+    Odpoveď sa cachuje v distances.db podľa (kanonické mesto, model, PROMPT_VERSION)
+    na LLM_CITY_CACHE_TTL_DAYS dní; force_refresh=True cache obíde a prepíše.
+    """
+    if not force_refresh:
+        cached = _load_cached(start_city)
+        if cached is not None:
+            cities = _cities(cached)
+            print(f"[LLM CACHE] Kandidátske mestá pre {start_city} z cache: {cities}")
+            return cities
+
+    print(f"--- LLM: HĽADANIE MIEST OKOLO {start_city} ---")
+    response: CityList = _city_chain(start_city).invoke({})
+    _store_cached(start_city, response)
+
+    cities = _cities(response)
+    print(f"LLM vybralo kandidátske mestá: {cities}")
+    return cities
+
+
+async def aget_candidate_cities_from_llm(start_city: str, force_refresh: bool = False) -> List[str]:
+    """
+    Async verzia get_candidate_cities_from_llm – LLM volanie (ainvoke) ani cache
+    neblokujú event loop, súbežné requesty sa na jednom workeri striedajú.
+    """
+    if not force_refresh:
+        cached = await _aload_cached(start_city)
+        if cached is not None:
+            cities = _cities(cached)
+            print(f"[LLM CACHE] Kandidátske mestá pre {start_city} z cache: {cities}")
+            return cities
+
+    print(f"--- LLM: HĽADANIE MIEST OKOLO {start_city} ---")
+    response: CityList = await _city_chain(start_city).ainvoke({})
+    await _astore_cached(start_city, response)
 
-    cities = [c.strip() for c in response.cities if c.strip()]
+    cities = _cities(response)
     print(f"LLM vybralo kandidátske mestá: {cities}")
-    return cities[:10]
+    return cities
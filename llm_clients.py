@@ -0,0 +1,100 @@
+# llm_clients.py
+"""
+Zdieľaní LLM klienti pre celý proces.
+
+ChatOpenAI si inak pri každom vytvorení otvorí vlastný HTTP klient – každý
+request by robil nový TLS handshake k providerovi. Tu je jeden sync a jeden
+async httpx klient s connection poolom (keep-alive) a ChatOpenAI inštancie
+sa cachujú podľa (model, teplota, seed).
+
+Uzly grafu si model berú z RunnableConfig:
+    app.invoke(inputs, config={"configurable": {"chat_model_factory": factory}})
+factory(temperature=..., seed=...) -> ChatOpenAI; bez nej sa použije shared_chat_model.
+"""
+import asyncio
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+from config import MODEL_NAME, LLM_MAX_CONNECTIONS, LLM_KEEPALIVE_CONNECTIONS, LLM_TIMEOUT_SECONDS
+
+_limits = httpx.Limits(
+    max_connections=LLM_MAX_CONNECTIONS,
+    max_keepalive_connections=LLM_KEEPALIVE_CONNECTIONS,
+)
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional[httpx.AsyncClient] = None
+# event loop, v ktorom async pool vznikol (spojenia sa nedajú zdieľať medzi loopmi)
+_async_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _clients():
+    global _http_client, _http_async_client, _async_loop
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.Client(limits=_limits, timeout=LLM_TIMEOUT_SECONDS)
+    if _http_async_client is None or _http_async_client.is_closed:
+        _http_async_client = httpx.AsyncClient(limits=_limits, timeout=LLM_TIMEOUT_SECONDS)
+        _async_loop = _running_loop()
+    return _http_client, _http_async_client
+
+
+def _check_loop() -> None:
+    # CLI volá asyncio.run viackrát – v novom loope treba nový async pool
+    global _http_async_client, _async_loop
+    loop = _running_loop()
+    if loop is None or loop is _async_loop:
+        return
+    if _async_loop is not None:
+        _http_async_client = None
+        _chat_model.cache_clear()
+    # pool vytvorený mimo loopu sa naviaže na prvý loop, ktorý ho použije
+    _async_loop = loop
+
+
+@lru_cache(maxsize=64)
+def _chat_model(model: str, temperature: float, seed: Optional[int]) -> ChatOpenAI:
+    http_client, http_async_client = _clients()
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        seed=seed,
+        http_client=http_client,
+        http_async_client=http_async_client,
+    )
+
+
+def shared_chat_model(temperature: float = 0.0, seed: Optional[int] = None) -> ChatOpenAI:
+    """ChatOpenAI nad zdieľaným connection poolom (jedna inštancia na parametre)."""
+    _check_loop()
+    return _chat_model(MODEL_NAME, temperature, seed)
+
+
+def get_chat_model(
+    config: Optional[Mapping[str, Any]] = None,
+    temperature: float = 0.0,
+    seed: Optional[int] = None,
+) -> ChatOpenAI:
+    """Model z config["configurable"]["chat_model_factory"], inak zdieľaný."""
+    configurable = (config or {}).get("configurable") or {}
+    factory = configurable.get("chat_model_factory") or shared_chat_model
+    return factory(temperature=temperature, seed=seed)
+
+
+async def aclose_clients() -> None:
+    """Zatvorí zdieľané HTTP klienty (shutdown web aplikácie)."""
+    global _http_client, _http_async_client
+    _chat_model.cache_clear()
+    if _http_async_client is not None:
+        await _http_async_client.aclose()
+    if _http_client is not None:
+        _http_client.close()
+    _http_client = _http_async_client = None
@@ -1,11 +1,11 @@
 import asyncio
 
+from config import CANDIDATE_SOURCE, PLANNER
 from models import AgentState
-from llm_cities import get_candidate_cities_from_llm
-from mcp_client import get_map_data_from_mcp
 from map_service import MapService
+from service import prepare_city_map, refine_with_routes
 from utils import get_workdays
-from workflow import build_workflow
+from workflow import get_workflow
 
 
 def _ask_yes_no(prompt: str, default: bool = False) -> bool:
@@ -56,6 +56,8 @@ def main():
         "target_km": 0,
         "final_sum_km": 0.0,
     }
+    candidate_source = CANDIDATE_SOURCE
+    planner = PLANNER
 
     #  Ručné zadanie vstupov
     if _ask_yes_no("Chceš zadať vstupné hodnoty ručne?", default=False):
@@ -65,6 +67,8 @@ def main():
         inputs["end_odo"] = _ask_int("Konečný stav tachometra (end_odo)", inputs["end_odo"])
         inputs["month"] = _ask_int("Mesiac (1-12)", inputs["month"])
         inputs["year"] = _ask_int("Rok", inputs["year"])
+        candidate_source = _ask_str("Zdroj kandidátskych miest (gazetteer/llm)", candidate_source)
+        planner = _ask_str("Plánovač jázd (llm/speculative/solver)", planner)
         print("Vstupy nastavené.\n")
     else:
         print("Používam preddefinované vstupné hodnoty.\n")
@@ -75,24 +79,23 @@ def main():
     print(f"Cieľová vzdialenosť (target_km): {inputs['target_km']} km")
     print(f"Počet pracovných dní: {len(inputs['workdays'])}")
 
-    # 2. Získame mestá z LLM a mapové dáta z MCP
-    city_map = None
-    try:
-        candidate_cities = get_candidate_cities_from_llm(inputs["start_city"])
-        city_map = asyncio.run(get_map_data_from_mcp(inputs["start_city"], candidate_cities))
-    except Exception as e:
-        print(f"VAROVANIE: Nepodarilo sa použiť MCP/LLM mapové dáta: {e}")
-        print("Prechádzam na statické fallback hodnoty.")
+    # 2. Získame kandidátske mestá (gazetteer / LLM), prefilter a mapové dáta z MCP
+    #    (pri PLANNING_MODE=estimate iba odhady – routuje sa až po plánovaní)
+    city_map, estimates = asyncio.run(
+        prepare_city_map(inputs["start_city"], inputs["target_km"], candidate_source)
+    )
 
     # 3. Inicializujeme MapService (dynamicky alebo fallback)
     map_tool = MapService(city_map)
     inputs["available_destinations"] = map_tool.get_destinations(inputs["start_city"])
 
     # 4. Build workflow a spustenie agenta
-    app = build_workflow()
+    app = get_workflow(planner=planner)
 
     try:
         result = app.invoke(inputs)
+        if estimates:
+            result = asyncio.run(refine_with_routes(result, estimates, planner))
         #for key, value in result.items(): print(f"{key}: {value}")
 
         file_name_csv = "kniha_jazd_ai_"+str(result["month"])+"_"+str(result["year"])+".csv"
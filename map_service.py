@@ -1,5 +1,7 @@
 from typing import Dict, List, Tuple
 
+from dbcache import resolve_city_key
+
 
 class MapService:
     def __init__(self, city_map: Dict[str, Tuple[float, int]] | None = None):
@@ -23,14 +25,23 @@ class MapService:
                 "Šamorín": (26.0, 30),
             }
 
+        # kanonický kľúč -> názov mesta (prvý zápis vyhráva)
+        self._keys: Dict[str, str] = {}
+        for name in self.mock_db:
+            self._keys.setdefault(resolve_city_key(name), name)
+
     def get_destinations(self, origin: str) -> List[Dict]:
         #Vráti mestá s ich vzdialenosťami a trvaním
+        #(rôzne zápisy toho istého mesta a samotné východzie mesto sa vynechajú)
+        origin_key = resolve_city_key(origin)
         return [
-            {"name": k, "dist": v[0], "dur": v[1]}
-            for k, v in self.mock_db.items()
+            {"name": name, "dist": self.mock_db[name][0], "dur": self.mock_db[name][1]}
+            for key, name in self._keys.items()
+            if key != origin_key
         ]
 
     def get_precise_route(self, origin: str, destination: str) -> Tuple[float, int]:
         #Vráti vzdialenosť a trvanie pre mesto z db vytvorenej llm.
-        dist, dur = self.mock_db.get(destination, (50.0, 50))
+        name = self._keys.get(resolve_city_key(destination), destination)
+        dist, dur = self.mock_db.get(name, (50.0, 50))
         return dist, dur
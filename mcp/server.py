@@ -8,15 +8,27 @@ Režim:
   - logovanie  na stdout
 """
 
+import asyncio
 import json
+import os
+import sqlite3
 import traceback
 import sys
+import threading
+import time
 from datetime import datetime
+from pathlib import Path
 
+import httpx
 from mcp.server.fastmcp import FastMCP
+from geopy.adapters import AioHTTPAdapter
+from geopy.extra.rate_limiter import AsyncRateLimiter
 from geopy.geocoders import Nominatim
 from geopy.distance import geodesic
-import requests
+
+# citynames.py je v koreni projektu (v Docker image vedľa server.py)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from citynames import canonical_key, ensure_alias_table, geocode_query, load_aliases
 
 # --------------------------------------------------------------------
 # ZÁKLADNÁ CONFIG
@@ -24,6 +36,25 @@ import requests
 DEBUG = False
 SERVER_NAME = "distance-driving-server"
 
+# Nominatim povoľuje max. ~1 request za sekundu – spolu za všetky server procesy
+# (MCP pool v každom uvicorn workeri, cache_cli prewarm); sloty sa rezervujú
+# v tabuľke rate_limits v distances.db
+NOMINATIM_MIN_DELAY = 1.0
+# perzistentná cache geokódovania – tabuľka geocode_cache v distances.db (koreň projektu),
+# zdieľaná všetkými server procesmi
+GEOCODE_DB_PATH = Path(
+    os.getenv("GEOCODE_DB_PATH", Path(__file__).resolve().parent.parent / "distances.db")
+)
+# keep-alive pool pre každý OSRM backend
+OSRM_TIMEOUT = 15
+OSRM_MAX_CONNECTIONS = 20
+# health probe: timeout (s) a ako dlho (s) platí výsledok
+OSRM_PROBE_TIMEOUT = 0.8
+OSRM_HEALTH_TTL = 30.0
+# circuit breaker: po N chybách po sebe backend vynecháme na X sekúnd
+OSRM_FAILURE_THRESHOLD = 3
+OSRM_CIRCUIT_OPEN_SECONDS = 60.0
+
 #OSRM_URL_TEMPLATE = (
 #    "http://router.project-osrm.org/route/v1/driving/"
 #    "{lon1},{lat1};{lon2},{lat2}?overview=false"
@@ -37,28 +68,17 @@ SERVER_NAME = "distance-driving-server"
 
 LOCAL_OSRM = "http://localhost:5000"
 REMOTE_OSRM = "http://router.project-osrm.org"
-OSRM_URL_TEMPLATE = (
-    "{base}/route/v1/driving/"
+OSRM_ROUTE_PATH_TEMPLATE = (
+    "/route/v1/driving/"
     "{lon1},{lat1};{lon2},{lat2}?overview=false"
 )
-
-# skontroluj a zisti co pouzit
-def detect_osrm_server(timeout=0.8):
-    """
-    Zistí, či beží lokálny OSRM (Docker).
-    Ak nie, vráti fallback URL.
-    """
-    test_url = f"{LOCAL_OSRM}/route/v1/driving/17,48;17,48?overview=false"
-
-    try:
-        resp = requests.get(test_url, timeout=timeout)
-        # ak OSRM beží, vždy vráti JSON (aj keď error=0 distance)
-        if resp.status_code in (200, 400):
-            return LOCAL_OSRM
-    except Exception:
-        pass
-    
-    return FALLBACK_OSRM
+# matica vzdialeností: 1 zdroj (index 0) -> N cieľov v jednom requeste
+OSRM_TABLE_PATH_TEMPLATE = (
+    "/table/v1/driving/"
+    "{coords}?sources=0&annotations=duration,distance"
+)
+# lacná trasa na health probe (bod sám so sebou)
+OSRM_PROBE_PATH = "/route/v1/driving/17,48;17,48?overview=false"
 
 
 # --------------------------------------------------------------------
@@ -83,34 +103,376 @@ log("====================================================")
 
 mcp = FastMCP(SERVER_NAME)
 
-log("Inicializujem Nominatim geocoder…")
-geolocator = Nominatim(user_agent=f"{SERVER_NAME}-geocoder", timeout=10)
-log("Nominatim geocoder inicializovaný.")
+# geokodér sa vytvára lenivo – až v bežiacom event loope servera
+_geocode = None
 
-# lokalna cache geokódovania {city_name_lower: (lat, lon)}
+# lokalna cache geokódovania {kanonický kľúč mesta: (lat, lon)}
 _geocode_cache: dict[str, tuple[float, float]] = {}
+# prebiehajúce geokódovania – súbežné požiadavky na to isté mesto čakajú na jeden request
+_geocode_inflight: dict[str, asyncio.Task] = {}
+
+
+# rezervácia slotov v rate_limits: vlastné spojenie (autocommit), volá sa z to_thread
+_rate_db: sqlite3.Connection | None = None
+_rate_db_lock = threading.Lock()
+
+
+def _reserve_slot(name: str, min_delay: float) -> float:
+    """
+    Atomicky (BEGIN IMMEDIATE) zaberie najbližší voľný slot pre `name`
+    a posunie ďalší o min_delay. Vráti čas (epoch) slotu.
+    """
+    global _rate_db
+    with _rate_db_lock:
+        if _rate_db is None:
+            conn = sqlite3.connect(
+                GEOCODE_DB_PATH, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits (name TEXT PRIMARY KEY, next_at REAL NOT NULL)"
+            )
+            _rate_db = conn
+        conn = _rate_db
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT next_at FROM rate_limits WHERE name = ?", (name,)).fetchone()
+            slot = max(time.time(), row[0] if row else 0.0)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits (name, next_at) VALUES (?, ?)",
+                (name, slot + min_delay),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    return slot
+
+
+async def wait_for_slot(name: str, min_delay: float) -> None:
+    """Počká na svoj slot – limit platí spolu pre všetky procesy nad distances.db."""
+    try:
+        slot = await asyncio.to_thread(_reserve_slot, name, min_delay)
+    except sqlite3.Error as e:
+        # bez DB radšej pomalšie ako porušiť limit
+        log(f"[RATE] Chyba rezervácie slotu ({e}), čakám {min_delay}s.")
+        await asyncio.sleep(min_delay)
+        return
+    delay = slot - time.time()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+def get_geocoder():
+    """Async Nominatim geokodér obalený rate limiterom (zdieľaný všetkými procesmi)."""
+    global _geocode
+    if _geocode is None:
+        log("Inicializujem async Nominatim geocoder…")
+        geolocator = Nominatim(
+            user_agent=f"{SERVER_NAME}-geocoder",
+            timeout=10,
+            adapter_factory=AioHTTPAdapter,
+        )
+
+        async def geocode(*args, **kwargs):
+            # každý pokus (aj retry) si berie vlastný slot
+            await wait_for_slot("nominatim", NOMINATIM_MIN_DELAY)
+            return await geolocator.geocode(*args, **kwargs)
+
+        _geocode = AsyncRateLimiter(
+            geocode,
+            min_delay_seconds=0,
+            max_retries=2,
+            error_wait_seconds=2.0,
+            # timeout/výpadok nesmie vyzerať ako "mesto neexistuje"
+            swallow_exceptions=False,
+        )
+        log("Nominatim geocoder inicializovaný.")
+    return _geocode
+
 
 # --------------------------------------------------------------------
-# Helper 
+# OSRM backendy – keep-alive pooly, cachovaný health stav, circuit breaker
 # --------------------------------------------------------------------
-def geocode_city(city: str):
-    city_key = city.strip().lower()
-    if city_key in _geocode_cache:
-        log(f"[GEOCODE] Cache hit pre {city!r}")
-        return _geocode_cache[city_key]
+class OSRMBackend:
+    """
+    Jeden OSRM server (lokálny Docker alebo verejný).
+    Drží vlastný keep-alive HTTP pool, health stav s TTL, circuit breaker
+    a počítadlá latencie.
+    """
+
+    def __init__(self, name: str, base_url: str):
+        self.name = name
+        self.base_url = base_url
+        self._client: httpx.AsyncClient | None = None
+
+        self.healthy: bool | None = None
+        self.checked_at = 0.0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_latency = 0.0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # vytvára sa lenivo – až v bežiacom event loope servera
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=OSRM_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=OSRM_MAX_CONNECTIONS,
+                    max_keepalive_connections=OSRM_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    @property
+    def circuit_open(self) -> bool:
+        return time.monotonic() < self.open_until
+
+    async def is_healthy(self) -> bool:
+        now = time.monotonic()
+        if self.healthy is not None and now - self.checked_at < OSRM_HEALTH_TTL:
+            return self.healthy
+
+        try:
+            resp = await self.client.get(OSRM_PROBE_PATH, timeout=OSRM_PROBE_TIMEOUT)
+            # ak OSRM beží, vždy vráti JSON (aj keď error=0 distance)
+            self.healthy = resp.status_code in (200, 400)
+        except httpx.HTTPError:
+            self.healthy = False
+
+        self.checked_at = time.monotonic()
+        log(f"[OSRM] Health probe {self.name}: {'OK' if self.healthy else 'DOWN'}")
+        return self.healthy
+
+    def _record(self, latency: float, ok: bool) -> None:
+        self.requests += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.last_latency = latency
+
+        if ok:
+            # úspešná požiadavka je zároveň dôkaz zdravia; jedna chyba backend
+            # nevyradí – to robí až circuit breaker (OSRM_FAILURE_THRESHOLD chýb po sebe)
+            self.healthy = True
+            self.checked_at = time.monotonic()
+            self.consecutive_failures = 0
+            return
+
+        self.errors += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= OSRM_FAILURE_THRESHOLD:
+            self.open_until = time.monotonic() + OSRM_CIRCUIT_OPEN_SECONDS
+            log(f"[OSRM] Circuit breaker OTVORENÝ pre {self.name} na {OSRM_CIRCUIT_OPEN_SECONDS:.0f} s")
+
+    async def get_json(self, path: str) -> dict:
+        started = time.monotonic()
+        try:
+            resp = await self.client.get(path)
+            # 400 = platná OSRM odpoveď (NoRoute, InvalidQuery…), nie výpadok servera
+            if resp.status_code >= 500:
+                resp.raise_for_status()
+            data = resp.json()
+        except (httpx.HTTPError, ValueError):
+            self._record(time.monotonic() - started, ok=False)
+            raise
+
+        self._record(time.monotonic() - started, ok=True)
+        return data
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "base_url": self.base_url,
+            "healthy": self.healthy,
+            "circuit_open": self.circuit_open,
+            "consecutive_failures": self.consecutive_failures,
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_latency_ms": round(1000 * self.total_latency / self.requests, 1) if self.requests else None,
+            "max_latency_ms": round(1000 * self.max_latency, 1),
+            "last_latency_ms": round(1000 * self.last_latency, 1),
+        }
+
 
+class OSRMBackendManager:
+    """
+    Vyberá OSRM backend v poradí priority (lokálny → verejný):
+    preskočí backendy s otvoreným circuit breakerom alebo nezdravým health stavom
+    a pri chybe požiadavky skúsi ďalší. Posledný backend (verejný) sa skúsi
+    bez health probe (pomalá sonda ho nevyradí), circuit breaker však platí
+    pre všetky – keď sú všetky vyradené, volanie hneď zlyhá namiesto čakania
+    na OSRM_TIMEOUT.
+    """
+
+    def __init__(self, backends: list[OSRMBackend]):
+        self.backends = backends
+
+    async def get_json(self, path: str) -> dict:
+        last_error: Exception | None = None
+        for i, backend in enumerate(self.backends):
+            if backend.circuit_open:
+                continue
+            last = i == len(self.backends) - 1
+            if not last and not await backend.is_healthy():
+                continue
+            try:
+                log(f"[OSRM] {backend.name}: {path}")
+                return await backend.get_json(path)
+            except Exception as e:
+                log(f"[OSRM] {backend.name} zlyhal: {e} – skúšam ďalší backend")
+                last_error = e
+
+        if last_error is None:
+            raise RuntimeError("Žiadny OSRM backend nie je dostupný (circuit breaker otvorený).")
+        raise RuntimeError(f"Žiadny OSRM backend nie je dostupný ({last_error})")
+
+    def stats(self) -> list[dict]:
+        return [backend.stats() for backend in self.backends]
+
+
+osrm = OSRMBackendManager(
+    [
+        OSRMBackend("local", LOCAL_OSRM),
+        OSRMBackend("remote", REMOTE_OSRM),
+    ]
+)
+
+
+# --------------------------------------------------------------------
+# Perzistentná cache geokódovania (SQLite, WAL – bezpečné pre viac procesov)
+# --------------------------------------------------------------------
+_geocode_db: sqlite3.Connection | None = None
+
+# aliasy miest (tabuľka city_aliases, spravuje ju dbcache) – obnovujú sa po N sekundách
+ALIAS_RELOAD_SECONDS = 60.0
+_aliases: dict[str, str] = {}
+_aliases_loaded_at = 0.0
+
+
+def get_geocode_db() -> sqlite3.Connection:
+    global _geocode_db
+    if _geocode_db is None:
+        conn = sqlite3.connect(GEOCODE_DB_PATH, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                city_key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                lat REAL NOT NULL,
+                lon REAL NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        ensure_alias_table(conn)
+        # staršie kľúče (strip().lower()) -> kanonické kľúče
+        conn.create_function("city_key", 1, canonical_key, deterministic=True)
+        conn.create_function("legacy_key", 1, lambda q: q.strip().lower(), deterministic=True)
+        legacy = "city_key = legacy_key(query) AND city_key != city_key(query)"
+        conn.execute(f"UPDATE OR IGNORE geocode_cache SET city_key = city_key(query) WHERE {legacy}")
+        conn.execute(f"DELETE FROM geocode_cache WHERE {legacy}")
+        conn.commit()
+        _geocode_db = conn
+    return _geocode_db
+
+
+def city_cache_key(city: str) -> str:
+    """Kanonický kľúč mesta (citynames) vrátane aliasov z DB."""
+    global _aliases, _aliases_loaded_at
+    if time.monotonic() - _aliases_loaded_at > ALIAS_RELOAD_SECONDS:
+        try:
+            _aliases = load_aliases(get_geocode_db())
+        except sqlite3.Error as e:
+            log(f"[GEOCODE] Chyba čítania aliasov: {e}")
+        _aliases_loaded_at = time.monotonic()
+    return canonical_key(city, _aliases)
+
+
+def load_cached_coord(city_key: str) -> tuple[float, float] | None:
+    try:
+        row = get_geocode_db().execute(
+            "SELECT lat, lon FROM geocode_cache WHERE city_key = ?",
+            (city_key,),
+        ).fetchone()
+    except sqlite3.Error as e:
+        log(f"[GEOCODE] Chyba čítania cache: {e}")
+        return None
+    return (row[0], row[1]) if row else None
+
+
+def store_cached_coord(city_key: str, query: str, coord: tuple[float, float]) -> None:
+    try:
+        conn = get_geocode_db()
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO geocode_cache (city_key, query, lat, lon)
+            VALUES (?, ?, ?, ?)
+            """,
+            (city_key, query, coord[0], coord[1]),
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        log(f"[GEOCODE] Chyba zápisu do cache: {e}")
+        return
+
+    # súradnice aj do tabuľky cities (spravuje ju dbcache), ak tam mesto už je
+    try:
+        conn.execute(
+            "UPDATE cities SET lat = ?, lon = ? WHERE name = ? AND lat IS NULL",
+            (coord[0], coord[1], city_key),
+        )
+        conn.commit()
+    except sqlite3.OperationalError:
+        pass
+
+
+# --------------------------------------------------------------------
+# Helper 
+# --------------------------------------------------------------------
+async def _geocode_remote(city: str, city_key: str):
     log(f"[GEOCODE] Geocoding mesta: {city!r}")
-    loc = geolocator.geocode(city)
+    loc = await get_geocoder()(geocode_query(city))
     if not loc:
         raise ValueError(f"Nepodarilo sa geokódovať mesto: {city}")
 
     coord = (loc.latitude, loc.longitude)
     _geocode_cache[city_key] = coord
+    store_cached_coord(city_key, city, coord)
     log(f"[GEOCODE] {city!r} → {coord}")
     return coord
 
 
-def get_driving_stats(coord1, coord2):
+async def geocode_city(city: str):
+    city_key = city_cache_key(city)
+    if city_key in _geocode_cache:
+        log(f"[GEOCODE] Cache hit pre {city!r}")
+        return _geocode_cache[city_key]
+
+    coord = load_cached_coord(city_key)
+    if coord is not None:
+        log(f"[GEOCODE] DB cache hit pre {city!r}")
+        _geocode_cache[city_key] = coord
+        return coord
+
+    task = _geocode_inflight.get(city_key)
+    if task is None:
+        task = asyncio.create_task(_geocode_remote(city, city_key))
+        _geocode_inflight[city_key] = task
+        task.add_done_callback(lambda _: _geocode_inflight.pop(city_key, None))
+
+    # shield – zrušenie jednej požiadavky nezruší geokódovanie ostatným
+    return await asyncio.shield(task)
+
+
+async def get_driving_stats(coord1, coord2):
     """
     Vráti (duration_seconds, distance_km_road) z OSRM
     - duration_seconds: čas jazdy autom v sekundách
@@ -119,16 +481,12 @@ def get_driving_stats(coord1, coord2):
     lat1, lon1 = coord1
     lat2, lon2 = coord2
 
-    url = OSRM_URL_TEMPLATE.format( 
-        base = detect_osrm_server(),
+    path = OSRM_ROUTE_PATH_TEMPLATE.format(
         lon1=lon1, lat1=lat1,
         lon2=lon2, lat2=lat2,
     )
 
-    log(f"[OSRM] Volám OSRM: {url}")
-    resp = requests.get(url, timeout=15)
-    resp.raise_for_status()
-    data = resp.json()
+    data = await osrm.get_json(path)
 
     if "routes" not in data or not data["routes"]:
         raise ValueError("OSRM nenašiel žiadnu trasu.")
@@ -146,6 +504,40 @@ def get_driving_stats(coord1, coord2):
     return duration, distance_km
 
 
+async def get_driving_matrix(origin_coord, dest_coords):
+    """
+    Vráti zoznam [(duration_seconds, distance_km_road) alebo None] z OSRM /table
+    pre všetky ciele naraz (jeden HTTP request).
+    - None znamená, že OSRM pre daný cieľ nenašiel trasu.
+    """
+    coords = ";".join(
+        f"{lon},{lat}" for lat, lon in [origin_coord, *dest_coords]
+    )
+    data = await osrm.get_json(OSRM_TABLE_PATH_TEMPLATE.format(coords=coords))
+
+    if data.get("code") != "Ok" or not data.get("durations"):
+        raise ValueError(f"OSRM table zlyhal: {data.get('message', data.get('code'))}")
+
+    # riadok 0 = zdroj, stĺpec 0 = zdroj sám so sebou -> preskočíme
+    durations = data["durations"][0][1:]
+    distances = data["distances"][0][1:]
+
+    stats = []
+    for duration, distance_m in zip(durations, distances):
+        if duration is None or distance_m is None:
+            stats.append(None)
+            continue
+        stats.append((duration, round(distance_m / 1000.0, 0)))
+
+    log(f"[OSRM] table OK – {len(stats)} cieľov")
+    return stats
+
+
+def _error_kind(exc: BaseException) -> str:
+    # ValueError = mesto sa nenašlo (trvalé), ostatné = sieť/služba (dočasné)
+    return "geocode" if isinstance(exc, ValueError) else "error"
+
+
 def format_duration(seconds: float) -> str:
     # Textový formát trvania (napr. '4 h 12 min')
     total_minutes = int(round(seconds / 60))
@@ -162,7 +554,7 @@ def format_duration(seconds: float) -> str:
 
 
 @mcp.tool()
-def driving_time_between_cities(city1: str, city2: str) -> dict:
+async def driving_time_between_cities(city1: str, city2: str) -> dict:
     """
     Vypočíta čas jazdy autom a vzdialenosť medzi dvomi mestami.
 
@@ -191,16 +583,15 @@ def driving_time_between_cities(city1: str, city2: str) -> dict:
     log("----------------------------------------------------")
 
     try:
-        # Geokódovanie miest
-        coord1 = geocode_city(city1)
-        coord2 = geocode_city(city2)
+        # Geokódovanie miest (súbežne; sieť aj tak serializuje rate limiter)
+        coord1, coord2 = await asyncio.gather(geocode_city(city1), geocode_city(city2))
 
         # Vzdušná vzdialenosť
         km_air = geodesic(coord1, coord2).km
         log(f"[DIST] Vzdušná vzdialenosť: {km_air:.2f} km")
 
         # Trasa po ceste + čas jazdy
-        seconds, km_road = get_driving_stats(coord1, coord2)
+        seconds, km_road = await get_driving_stats(coord1, coord2)
         human = format_duration(seconds)
 
         result = {
@@ -221,6 +612,105 @@ def driving_time_between_cities(city1: str, city2: str) -> dict:
         return {"error": str(e)}
 
 
+@mcp.tool()
+async def driving_matrix(origin: str, destinations: list[str]) -> dict:
+    """
+    Vypočíta čas jazdy a vzdialenosť z jedného mesta do viacerých cieľov naraz
+    (jedno geokódovanie na mesto + jeden OSRM /table request).
+
+    Args:
+        origin: Východzie mesto (napr. 'Vrbové')
+        destinations: Zoznam cieľových miest (napr. ['Bratislava', 'Trnava'])
+
+    Returns:
+        dict:
+            {
+              "origin": ...,
+              "results": [ {rovnaká štruktúra ako driving_time_between_cities}, ... ],
+              "errors": [ {"city2": ..., "kind": ..., "error": "popis chyby"}, ... ]
+            }
+        alebo:
+            {"error": "popis chyby", "kind": ...}
+
+        kind: "geocode" (mesto sa nedá geokódovať), "route" (OSRM nenašiel trasu),
+              "error" (dočasná chyba – timeout, výpadok služby)
+    """
+    log("----------------------------------------------------")
+    log(f"[TOOL CALL] driving_matrix({origin!r}, {destinations!r})")
+    log("----------------------------------------------------")
+
+    try:
+        origin_coord = await geocode_city(origin)
+    except Exception as e:
+        log(f"[ERROR] Geokódovanie východzieho mesta zlyhalo: {e}")
+        return {"error": str(e), "kind": _error_kind(e)}
+
+    results = []
+    errors = []
+
+    # Geokódovanie cieľov – chyba jedného mesta nezhodí celý výpočet
+    coords = await asyncio.gather(
+        *(geocode_city(city) for city in destinations),
+        return_exceptions=True,
+    )
+    resolved = []
+    for city, coord in zip(destinations, coords):
+        if isinstance(coord, Exception):
+            errors.append({"city2": city, "kind": _error_kind(coord), "error": str(coord)})
+        else:
+            resolved.append((city, coord))
+
+    if not resolved:
+        return {"origin": origin, "results": results, "errors": errors}
+
+    try:
+        stats = await get_driving_matrix(origin_coord, [coord for _, coord in resolved])
+    except Exception as e:
+        log("[ERROR] Výnimka pri OSRM table požiadavke:")
+        traceback.print_exc()
+        return {"error": str(e), "kind": "error"}
+
+    for (city, coord), stat in zip(resolved, stats):
+        if stat is None:
+            errors.append({"city2": city, "kind": "route", "error": "OSRM nenašiel žiadnu trasu."})
+            continue
+
+        seconds, km_road = stat
+        km_air = geodesic(origin_coord, coord).km
+        results.append(
+            {
+                "city1": origin,
+                "city2": city,
+                "driving_time_seconds": int(round(seconds)),
+                "driving_time_human": format_duration(seconds),
+                "distance_km_road": round(km_road, 2),
+                "distance_km_air": round(km_air, 2),
+            }
+        )
+
+    log(f"[RESULT] {len(results)} trás, {len(errors)} chýb")
+    return {"origin": origin, "results": results, "errors": errors}
+
+
+@mcp.tool()
+async def osrm_backend_stats() -> dict:
+    """
+    Vráti stav a počítadlá latencie jednotlivých OSRM backendov.
+
+    Returns:
+        dict:
+            {
+              "backends": [
+                {"name": ..., "base_url": ..., "healthy": bool | None,
+                 "circuit_open": bool, "requests": int, "errors": int,
+                 "avg_latency_ms": float | None, "max_latency_ms": float, ...},
+                ...
+              ]
+            }
+    """
+    return {"backends": osrm.stats()}
+
+
 # --------------------------------------------------------------------
 # ŠTART SERVERA – STDIO / SSE (MCP režim)
 # --------------------------------------------------------------------
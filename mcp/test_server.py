@@ -47,6 +47,20 @@ async def main():
             print(result)
             print("===========================")
 
+            print("\nVolám tool 'driving_matrix'...")
+
+            result = await session.call_tool(
+                "driving_matrix",
+                {
+                    "origin": "Vrbové",
+                    "destinations": ["Bratislava", "Trnava", "Nitra"],
+                },
+            )
+
+            print("\n===== VÝSLEDOK TOOLU =====")
+            print(result)
+            print("===========================")
+
 
 if __name__ == "__main__":
     asyncio.run(main())
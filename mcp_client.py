@@ -1,12 +1,26 @@
 # mcp_client.py
 import os
 import json
-from typing import List, Dict, Tuple
+import asyncio
+from contextlib import asynccontextmanager, nullcontext
+from datetime import timedelta
+from typing import AsyncIterator, Any, Callable, List, Dict, Tuple
 
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
 
-from dbcache import init_db, get_distance_from_db, save_mcp_record
+from config import (
+    MCP_POOL_SIZE,
+    MCP_HEALTH_INTERVAL,
+    MCP_PING_TIMEOUT,
+    MCP_ACQUIRE_TIMEOUT,
+    MCP_CONCURRENCY,
+    MCP_CALL_TIMEOUT,
+    MCP_BATCH_SIZE,
+)
+from dbcache import init_db
+from dbcache_async import distance_cache
 
 
 # Inicializácia DB pri importe
@@ -23,76 +37,328 @@ server_params = StdioServerParameters(
 )
 
 
+class MCPSessionPool:
+    """
+    Pool teplých MCP session zdieľaný celým procesom.
+
+    - každý slot drží vlastný server.py subprocess + inicializovanú ClientSession,
+    - voľné session sa pravidelne pingujú, mŕtve sloty sa reštartujú (s backoffom),
+    - session sa požičiavajú cez `async with pool.session() as session:`.
+
+    Štart/stop riadi FastAPI lifespan (web_app.py). Kým pool nebeží,
+    get_map_data_from_mcp spúšťa jednorazový server ako doteraz (CLI).
+    """
+
+    def __init__(
+        self,
+        params: StdioServerParameters,
+        size: int = 2,
+        health_interval: float = 30.0,
+        ping_timeout: float = 5.0,
+        acquire_timeout: float = 30.0,
+    ):
+        self.params = params
+        self.size = max(1, size)
+        self.health_interval = health_interval
+        self.ping_timeout = ping_timeout
+        self.acquire_timeout = acquire_timeout
+
+        self._idle: asyncio.Queue | None = None
+        self._stopping: asyncio.Event | None = None
+        self._slots: List[asyncio.Task] = []
+        self._current: Dict[int, ClientSession] = {}
+        self._restart: Dict[int, asyncio.Event] = {}
+        self.restarts = 0
+
+    @property
+    def started(self) -> bool:
+        return bool(self._slots)
+
+    async def start(self) -> None:
+        if self.started:
+            return
+        print(f"[MCP POOL] Štartujem {self.size} MCP server(ov).")
+        self._idle = asyncio.Queue()
+        self._stopping = asyncio.Event()
+        for idx in range(self.size):
+            self._restart[idx] = asyncio.Event()
+            self._slots.append(
+                asyncio.create_task(self._run_slot(idx), name=f"mcp-pool-slot-{idx}")
+            )
+
+    async def stop(self) -> None:
+        if not self.started:
+            return
+        print("[MCP POOL] Zastavujem MCP servery.")
+        self._stopping.set()
+        for event in self._restart.values():
+            event.set()
+        await asyncio.gather(*self._slots, return_exceptions=True)
+        self._slots.clear()
+        self._current.clear()
+        self._restart.clear()
+
+    async def _run_slot(self, idx: int) -> None:
+        # stdio_client/ClientSession sa musia otvoriť aj zavrieť v tom istom tasku
+        backoff = 1.0
+        while not self._stopping.is_set():
+            restart = self._restart[idx]
+            restart.clear()
+            try:
+                async with stdio_client(self.params) as (read, write):
+                    async with ClientSession(read, write) as session:
+                        await session.initialize()
+                        tools = await session.list_tools()
+                        print(f"[MCP POOL] Slot {idx} pripravený: {[t.name for t in tools.tools]}")
+
+                        self._current[idx] = session
+                        self._idle.put_nowait((idx, session))
+                        backoff = 1.0
+                        await self._watch(session, restart)
+            except Exception as e:
+                print(f"[MCP POOL] Slot {idx} zlyhal: {e}")
+            finally:
+                self._current.pop(idx, None)
+
+            if self._stopping.is_set():
+                break
+
+            self.restarts += 1
+            print(f"[MCP POOL] Reštartujem slot {idx} o {backoff:.0f} s.")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def _watch(self, session: ClientSession, restart: asyncio.Event) -> None:
+        # health check – ping; výnimka ukončí session a slot sa reštartuje
+        while not restart.is_set():
+            try:
+                await asyncio.wait_for(restart.wait(), timeout=self.health_interval)
+            except asyncio.TimeoutError:
+                await asyncio.wait_for(session.send_ping(), timeout=self.ping_timeout)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[ClientSession]:
+        while True:
+            try:
+                idx, session = await asyncio.wait_for(
+                    self._idle.get(), timeout=self.acquire_timeout
+                )
+            except asyncio.TimeoutError:
+                raise RuntimeError("MCP pool: žiadna voľná session.") from None
+            # zastaraná session (slot sa medzitým reštartoval) – zahodíme
+            if self._current.get(idx) is session:
+                break
+
+        broken = False
+        try:
+            yield session
+        except McpError:
+            # chybová odpoveď servera – spojenie je v poriadku
+            raise
+        except Exception:
+            broken = True
+            raise
+        finally:
+            if broken:
+                print(f"[MCP POOL] Session v slote {idx} je poškodená, reštartujem.")
+                self._restart[idx].set()
+            elif self._current.get(idx) is session:
+                self._idle.put_nowait((idx, session))
+
+
+mcp_pool = MCPSessionPool(
+    server_params,
+    size=MCP_POOL_SIZE,
+    health_interval=MCP_HEALTH_INTERVAL,
+    ping_timeout=MCP_PING_TIMEOUT,
+    acquire_timeout=MCP_ACQUIRE_TIMEOUT,
+)
+
+
+@asynccontextmanager
+async def open_mcp_session() -> AsyncIterator[ClientSession]:
+    """
+    Session z poolu, ak beží (web app), inak jednorazový server.py (CLI).
+    """
+    if mcp_pool.started:
+        async with mcp_pool.session() as session:
+            yield session
+        return
+
+    async with stdio_client(server_params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            tools = await session.list_tools()
+            print("Available MCP services:", [t.name for t in tools.tools])
+            yield session
+
+
+@asynccontextmanager
+async def _session_factory() -> AsyncIterator[Callable[[], Any]]:
+    """
+    Vráti továreň na session pre paralelné volania:
+    - s bežiacim poolom si každé volanie požičia vlastnú session (vlastný proces),
+    - bez poolu (CLI) zdieľajú všetky volania jednu jednorazovú session.
+    """
+    if mcp_pool.started:
+        yield open_mcp_session
+        return
+
+    async with open_mcp_session() as shared:
+        yield lambda: nullcontext(shared)
+
+
+async def _call_matrix_chunk(
+    new_session: Callable[[], Any],
+    semaphore: asyncio.Semaphore,
+    start_city: str,
+    chunk: List[str],
+) -> Tuple[List[Dict[str, Any]], Dict[str, Tuple[str, str]]]:
+    """
+    Jedno volanie driving_matrix pre časť cieľov.
+    Vráti (results, failures), kde failures = { mesto: (kind, dôvod) }.
+    Nikdy nevyhadzuje – chyba volania (timeout, plný pool, pád servera) sa
+    premietne do failures pre celý chunk ako kind "transport".
+    """
+    async with semaphore:
+        print(f"→ MCP call: driving_matrix {start_city} → {chunk}")
+        try:
+            async with new_session() as session:
+                result = await session.call_tool(
+                    "driving_matrix",
+                    {
+                        "origin": start_city,
+                        "destinations": chunk,
+                    },
+                    read_timeout_seconds=timedelta(seconds=MCP_CALL_TIMEOUT),
+                )
+            matrix = json.loads(result.content[0].text)
+        except Exception as e:
+            return [], {city: ("transport", f"MCP volanie zlyhalo: {e}") for city in chunk}
+
+    if "error" in matrix:
+        # nedá sa geokódovať východzie mesto -> zlyhá celé volanie
+        kind = "origin" if matrix.get("kind") == "geocode" else "error"
+        return [], {city: (kind, matrix["error"]) for city in chunk}
+
+    failures = {
+        err.get("city2"): (err.get("kind", "error"), err.get("error", "neznáma chyba"))
+        for err in matrix.get("errors", [])
+    }
+    results: List[Dict[str, Any]] = []
+    for data in matrix.get("results", []):
+        try:
+            float(data["distance_km_road"])
+            int(data["driving_time_seconds"])
+        except Exception as e:
+            failures[data.get("city2")] = ("error", f"MCP dáta neúplné: {data} ({e})")
+            continue
+        results.append(data)
+
+    return results, failures
+
+
+async def fetch_driving_matrix(
+    start_city: str,
+    destinations: List[str],
+) -> Tuple[List[Dict[str, Any]], Dict[str, Tuple[str, str]]]:
+    """
+    Paralelne (max. MCP_CONCURRENCY naraz) zavolá driving_matrix po dávkach
+    MCP_BATCH_SIZE miest, každé volanie s timeoutom MCP_CALL_TIMEOUT.
+
+    Vráti (results, failures):
+      - results: MCP záznamy (tvar ako driving_time_between_cities),
+      - failures: { mesto: (kind, dôvod) } pre mestá, ktoré sa nepodarilo vyriešiť;
+        kind = "geocode" | "origin" | "route" | "error" (dočasná chyba servera)
+               | "transport" (MCP volanie zlyhalo – neukladá sa do negatívnej cache).
+    """
+    chunks = [
+        destinations[i:i + MCP_BATCH_SIZE]
+        for i in range(0, len(destinations), MCP_BATCH_SIZE)
+    ]
+    semaphore = asyncio.Semaphore(MCP_CONCURRENCY)
+
+    async with _session_factory() as new_session:
+        chunk_results = await asyncio.gather(
+            *(_call_matrix_chunk(new_session, semaphore, start_city, chunk) for chunk in chunks)
+        )
+
+    results: List[Dict[str, Any]] = []
+    failures: Dict[str, Tuple[str, str]] = {}
+    for chunk_ok, chunk_failed in chunk_results:
+        results.extend(chunk_ok)
+        failures.update(chunk_failed)
+    return results, failures
+
+
 async def get_map_data_from_mcp(start_city: str, candidate_cities: List[str]) -> Dict[str, Tuple[float, int]]:
     """
-    1. Skúsi nájsť trasy v lokálnej SQLite DB (city_distances).
-    2. Pre chýbajúce mestá zavolá MCP tool `driving_time_between_cities`.
-    3. Nové výsledky z MCP uloží celé do DB (save_mcp_record).
-    4. Vráti city_map: { city_name: (distance_km_road, duration_min) }.
+    1. Skúsi nájsť trasy v lokálnej SQLite DB (city_distances) – jeden bulk dotaz.
+    2. Mestá, ktoré nedávno zlyhali (negatívna cache), preskočí bez volania siete.
+    3. Pre ostatné chýbajúce mestá paralelne zavolá MCP tool `driving_matrix` (po dávkach).
+    4. Nové výsledky z MCP uloží celé do DB v jednej transakcii – aj keď časť miest zlyhá;
+       zlyhania nahlásené serverom uloží do negatívnej cache (transportné nie).
+    5. Vráti city_map: { city_name: (distance_km_road, duration_min) } v poradí kandidátov.
     """
     print("--- MAP DATA: DB cache + MCP fallback ---")
 
-    city_map: Dict[str, Tuple[float, int]] = {}
     missing: List[str] = []
 
     # 1) Najprv čítanie z DB cache
+    city_map: Dict[str, Tuple[float, int]] = await distance_cache.get_distances_bulk(
+        start_city, candidate_cities
+    )
     for dest_city in candidate_cities:
-        cached = get_distance_from_db(start_city, dest_city)
-        if cached:
-            dist_km, duration_min = cached
-            city_map[dest_city] = (dist_km, duration_min)
+        if dest_city in city_map:
+            dist_km, duration_min = city_map[dest_city]
             print(f"[DB] {start_city} -> {dest_city}: {dist_km:.2f} km, {duration_min} min")
         else:
             missing.append(dest_city)
 
+    # 2) Známe zlyhania – bez volania siete
+    if missing:
+        known_bad = await distance_cache.get_known_failures(start_city, missing)
+        for dest_city, reason in known_bad.items():
+            print(f"[DB] Preskakujem {dest_city} (nedávno zlyhalo: {reason})")
+        missing = [city for city in missing if city not in known_bad]
+
     if not missing:
-        print("[MAP DATA] Všetky trasy nájdené v DB, MCP sa nevolá.")
+        print("[MAP DATA] Všetky trasy vyriešené z DB, MCP sa nevolá.")
+        if not city_map:
+            raise RuntimeError("Žiadne použiteľné trasy – všetky mestá sú v negatívnej cache.")
         return city_map
 
     print(f"[MAP DATA] Pre {len(missing)} miest nie sú dáta v DB – volám MCP.")
 
-    # 2) MCP iba pre chýbajúce
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
-            tools = await session.list_tools()
-            print("Available MCP services:", [t.name for t in tools.tools])
-
-            for dest_city in missing:
-                print(f"→ MCP call: {start_city} → {dest_city}")
-
-                result = await session.call_tool(
-                    "driving_time_between_cities",
-                    {
-                        "city1": start_city,
-                        "city2": dest_city,
-                    }
-                )
+    # 3) MCP iba pre chýbajúce – paralelné dávky driving_matrix
+    results, failures = await fetch_driving_matrix(start_city, missing)
 
-                try:
-                    raw_json = result.content[0].text
-                    data = json.loads(raw_json)
-                except Exception as e:
-                    print(f"Chyba parsovania výsledku z MCP pre {dest_city}: {e}")
-                    continue
+    for dest_city, (kind, reason) in failures.items():
+        print(f"[MCP] Zlyhalo {dest_city} ({kind}): {reason}")
+    await distance_cache.save_failures(start_city, failures)
 
-                try:
-                    dist_km = float(data["distance_km_road"])
-                    duration_min = int(data["driving_time_seconds"] // 60)
-                except Exception as e:
-                    print(f"MCP dáta neúplné pre {dest_city}: {data}  ({e})")
-                    continue
+    for data in results:
+        dest_city = data["city2"]
+        dist_km = float(data["distance_km_road"])
+        duration_min = int(data["driving_time_seconds"] // 60)
 
-                # pridáme do mapy pre ďalšie spracovanie
-                city_map[dest_city] = (dist_km, duration_min)
-                print(f"[MCP] {dest_city}: {dist_km:.2f} km, {duration_min} min")
+        # pridáme do mapy pre ďalšie spracovanie
+        city_map[dest_city] = (dist_km, duration_min)
+        print(f"[MCP] {dest_city}: {dist_km:.2f} km, {duration_min} min")
 
-                # uložíme CELÝ MCP záznam do DB
-                save_mcp_record(data)
-                print(f"[DB] Uložené: {data['city1']} ↔ {data['city2']}")
+    # uložíme CELÉ MCP záznamy do DB jednou transakciou
+    saved = await distance_cache.save_mcp_records_bulk(results)
+    if saved:
+        print(f"[DB] Uložených {saved} trás pre {start_city}")
 
     if not city_map:
         raise RuntimeError("MCP nevrátil žiadne použiteľné trasy ani po cache pokuse.")
 
+    if failures:
+        print(f"[MAP DATA] {len(failures)} z {len(missing)} miest bez trasy: {list(failures)}")
+
+    # výsledok v poradí kandidátov
+    city_map = {city: city_map[city] for city in candidate_cities if city in city_map}
+
     print(f"Finálny city_map (DB + MCP): {city_map}")
     return city_map
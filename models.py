@@ -2,6 +2,9 @@ from typing import List, Dict
 from typing_extensions import TypedDict
 from pydantic import BaseModel, Field
 
+# názov doplnkovej jazdy z FINAL_CORRECTOR (nie je to reálne mesto)
+SERVICE_TRIP_NAME = "Servisná Jazda (doladenie)"
+
 
 class TripEntry(BaseModel):
     day_index: int = Field(description="Index dňa v zozname pracovných dní (0 až N)")
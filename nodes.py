@@ -1,23 +1,35 @@
+import asyncio
 import datetime
 import itertools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from io import BytesIO
 import math
-from typing import List
+from typing import List, Optional, Tuple
 
 import pandas as pd
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableConfig
 
-from config import MODEL_NAME
-from models import AgentState, TripEntry, TripSchedule
+from config import SPECULATIVE_K
+from llm_clients import get_chat_model
+from models import AgentState, TripEntry, TripSchedule, SERVICE_TRIP_NAME
+from trimmer import trim_to_target
 
 
 # --- AI PLANNER ---
 
-def ai_planner_node(state: AgentState):
-    print(f"--- 1. AI PLANNING (Pokus: {state['retry_count']}) ---")
+# tolerancia plánu voči targetu (validator)
+TOLERANCE_KM = 50
+
 
-    llm = ChatOpenAI(model=MODEL_NAME, temperature=0.1)
+def _planner_chain(
+    state: AgentState,
+    config: Optional[RunnableConfig] = None,
+    temperature: float = 0.1,
+    seed: Optional[int] = None,
+):
+    """Prompt | LLM so štruktúrovaným výstupom TripSchedule (model z configu / zdieľaný)."""
+    llm = get_chat_model(config, temperature=temperature, seed=seed)
 
     target = state["target_km"]
     workdays = state["workdays"]
@@ -100,9 +112,10 @@ def ai_planner_node(state: AgentState):
     )
 
     structured_llm = llm.with_structured_output(TripSchedule)
-    chain = prompt | structured_llm
-    response: TripSchedule = chain.invoke({})
+    return prompt | structured_llm
 
+
+def _planner_result(state: AgentState, response: TripSchedule):
     planned_km = sum(t.distance_one_way * 2 for t in response.plan)
     print(f"AI Reasoning: {response.reasoning}")
     print(f"AI naplánovala {len(response.plan)} jázd, vypočítaný TOTAL_KM_REAL: {planned_km:.1f} km.")
@@ -115,12 +128,136 @@ def ai_planner_node(state: AgentState):
     }
 
 
+def ai_planner_node(state: AgentState, config: Optional[RunnableConfig] = None):
+    print(f"--- 1. AI PLANNING (Pokus: {state['retry_count']}) ---")
+
+    response: TripSchedule = _planner_chain(state, config).invoke({})
+    return _planner_result(state, response)
+
+
+async def aai_planner_node(state: AgentState, config: Optional[RunnableConfig] = None):
+    """Async verzia ai_planner_node (app.ainvoke) – LLM volanie neblokuje event loop."""
+    print(f"--- 1. AI PLANNING (Pokus: {state['retry_count']}) ---")
+
+    response: TripSchedule = await _planner_chain(state, config).ainvoke({})
+    return _planner_result(state, response)
+
+
+def score_plan(schedule: TripSchedule, target: float, num_workdays: int) -> Tuple[int, int, float, int]:
+    """
+    Skóre plánu (menšie = lepšie):
+    1) porušenia "max. jedna jazda na deň" (duplicitné / neplatné day_index),
+    2) mimo tolerancie ±50 km,
+    3) odchýlka od targetu, 4) pri rovnosti radšej nad targetom.
+    """
+    days = [t.day_index for t in schedule.plan]
+    violations = len(days) - len(set(days)) + sum(1 for d in days if not 0 <= d < num_workdays)
+    diff = sum(t.distance_one_way * 2 for t in schedule.plan) - target
+    return violations, int(abs(diff) > TOLERANCE_KM), abs(diff), int(diff < 0)
+
+
+def _speculative_attempts(state: AgentState) -> List[Tuple[float, int]]:
+    # (teplota, seed) pre každé súbežné volanie – teploty rovnomerne v [0.1, 1.0]
+    # bez ohľadu na SPECULATIVE_K (OpenAI odmietne teplotu nad 2.0)
+    k = max(1, SPECULATIVE_K)
+    return [
+        (round(0.1 + 0.9 * i / max(1, k - 1), 2), state["retry_count"] * k + i)
+        for i in range(k)
+    ]
+
+
+def _keep_better(best, response: TripSchedule, temperature: float, state: AgentState):
+    score = score_plan(response, state["target_km"], len(state["workdays"]))
+    print(
+        f"  Plán (teplota {temperature}): {len(response.plan)} jázd, "
+        f"odchýlka {score[2]:.1f} km, porušení {score[0]}"
+    )
+    if best is None or score < best[0]:
+        best = (score, response)
+    return best
+
+
+def speculative_planner_node(state: AgentState, config: Optional[RunnableConfig] = None):
+    """
+    AI PLANNER v špekulatívnom režime: SPECULATIVE_K volaní naraz (rôzne
+    teploty a seedy), ponechá sa najlepší plán podľa score_plan. Keď prvý
+    platný plán v tolerancii dorazí, na ostatné sa nečaká.
+    """
+    print(f"--- 1. AI PLANNING – špekulatívne x{SPECULATIVE_K} (Pokus: {state['retry_count']}) ---")
+
+    attempts = _speculative_attempts(state)
+    best: Optional[Tuple[Tuple, TripSchedule]] = None
+    errors = []
+    executor = ThreadPoolExecutor(max_workers=len(attempts), thread_name_prefix="planner")
+    try:
+        futures = {
+            executor.submit(_planner_chain(state, config, temperature, seed).invoke, {}): temperature
+            for temperature, seed in attempts
+        }
+        for future in as_completed(futures):
+            try:
+                response: TripSchedule = future.result()
+            except Exception as e:
+                errors.append(e)
+                print(f"  Volanie (teplota {futures[future]}) zlyhalo: {e}")
+                continue
+
+            best = _keep_better(best, response, futures[future], state)
+            if best[0][:2] == (0, 0):
+                print("  Plán v tolerancii – ostatné volania ruším.")
+                break
+    finally:
+        # bežiace HTTP volania dobehnú na pozadí, čakajúce sa zrušia
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if best is None:
+        raise errors[0]
+    return _planner_result(state, best[1])
+
+
+async def aspeculative_planner_node(state: AgentState, config: Optional[RunnableConfig] = None):
+    """
+    Async verzia speculative_planner_node – volania sú asyncio tasky,
+    po prvom pláne v tolerancii sa zvyšné naozaj zrušia (aj rozbehnuté HTTP).
+    """
+    print(f"--- 1. AI PLANNING – špekulatívne x{SPECULATIVE_K} (Pokus: {state['retry_count']}) ---")
+
+    async def attempt(temperature: float, seed: int):
+        return temperature, await _planner_chain(state, config, temperature, seed).ainvoke({})
+
+    tasks = [asyncio.create_task(attempt(t, seed)) for t, seed in _speculative_attempts(state)]
+    best: Optional[Tuple[Tuple, TripSchedule]] = None
+    errors = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                temperature, response = await next_done
+            except Exception as e:
+                errors.append(e)
+                print(f"  Volanie zlyhalo: {e}")
+                continue
+
+            best = _keep_better(best, response, temperature, state)
+            if best[0][:2] == (0, 0):
+                print("  Plán v tolerancii – ostatné volania ruším.")
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if best is None:
+        raise errors[0]
+    return _planner_result(state, best[1])
+
+
 # --- VALIDATOR ---
 
 def validator_node(state: AgentState):
     """
     Logika:
-    - Pod targetom o viac ako 50 km -> späť na AI PLANNER
+    - Pod targetom o viac ako 50 km -> REPAIR (doplní voľné dni),
+      AI PLANNER až keď oprava neexistuje
     - Pod targetom o max 50 km -> FINAL_CORRECTOR (pridá 1 jazdu do 50 km)
     - Nad targetom o max 50 km -> FINAL_CORRECTOR (nič nepridá)
     - Nad targetom o viac ako 50 km -> PY_TRIMMER (odstráni jazdy)
@@ -140,17 +277,9 @@ def validator_node(state: AgentState):
         deficit = -diff
 
         if deficit > 50:
-            if state["retry_count"] - 1 >= state["max_retries"]:
-                print("Maximálny počet pokusov, posielam do FINAL_CORRECTOR (nebude vedieť dorovnať všetko).")
-                return {"next_step": "final_corrector", "feedback_message": ""}
-
-            feedback = (
-                f"Celkový súčet km ({current_km_sum:.1f}) je o {deficit:.1f} km pod cieľom {target}. "
-                "Navrhni NOVÝ plán s viac jazdami alebo dlhšími trasami. "
-                "KĽUDNE MÔŽEŠ CIEĽ PREKROČIŤ (je lepšie byť nad cieľom ako pod ním)."
-            )
-            print("Príliš veľký deficit, vraciam späť na AI_PLANNER.")
-            return {"next_step": "ai_planner", "feedback_message": feedback}
+            # najprv lokálna oprava (doplnenie voľných dní), LLM iba ak neexistuje
+            print("Príliš veľký deficit -> REPAIR doplní jazdy do voľných dní.")
+            return {"next_step": "repair", "feedback_message": ""}
 
         print("Deficit ≤ 50 km -> FINAL_CORRECTOR doplní krátku jazdu.")
         return {"next_step": "final_corrector", "feedback_message": ""}
@@ -171,9 +300,8 @@ def validator_node(state: AgentState):
 def py_trimmer_node(state: AgentState):
     """
     PYTHON TRIMMER (nová verzia):
-    - bez LLM, iteratívne odstraňuje jazdy
-    - cieľ: dostať sa čo najbližšie k targetu
-    - preferuje interval [target - 50, target + 50], ale je best-effort
+    - bez LLM, množinu jázd na odstránenie vyberie naraz (trimmer.trim_to_target)
+    - cieľ: dostať sa čo najbližšie k targetu, pri rovnosti radšej nad targetom
     """
 
     print("--- 3. PYTHON TRIMMER (odstraňovanie jázd) ---")
@@ -195,63 +323,16 @@ def py_trimmer_node(state: AgentState):
             "next_step": "final_corrector",
         }
 
-    # Iteratívne odstraňovanie jázd
-    # Budeme hľadať vždy takú jazdu, ktorej odstránenie nás najviac priblíži k targetu.
-    while True:
-        current_sum = total_km(trips)
-        overshoot = current_sum - target
-
-        print(f"  Aktuálny súčet: {current_sum:.1f} km (overshoot: {overshoot:+.1f} km)")
-
-        # Sme v tolerancii? -> hotovo
-        if abs(overshoot) <= 50:
-            print("  Sme v tolerancii ±50 km, končím trimmovanie.")
-            break
-
-        if not trips or overshoot <= 0:
-            # už nie je čo odstraňovať alebo sme pod targetom
-            print("  Nie je čo odstraňovať alebo už nie sme nad targetom, končím.")
-            break
-
-        # Vyberieme najlepšiu jazdu na odstránenie
-        best_index = None
-        best_new_sum = None
-        best_diff = None
-
-        candidates = []
-        for idx, trip in enumerate(trips):
-            contrib = trip.distance_one_way * 2
-            new_sum = current_sum - contrib
-            diff = abs(new_sum - target)
-            candidates.append((idx, new_sum, diff))
-
-        # Preferujeme kandidátov, kde new_sum >= target - 50 (aby sme nepadli hlboko pod)
-        preferred = [c for c in candidates if c[1] >= (target - 50)]
-        if not preferred:
-            # ak žiadny taký nie je, berieme všetkých – radšej byť výrazne bližšie,
-            # aj keby sme spadli trochu pod target - 50
-            preferred = candidates
-
-        # vyber najlepší – minimálna odchýlka, pri rovnosti preferujeme súčet nad targetom
-        def sort_key(c):
-            idx, new_sum, diff = c
-            # priorita: 1) menší diff, 2) či je nad targetom, 3) väčší new_sum
-            above = 0 if new_sum >= target else 1
-            return (diff, above, -new_sum)
-
-        best_index, best_new_sum, best_diff = min(preferred, key=sort_key)
-
-        removed_trip = trips.pop(best_index)
+    # Optimálny výber naraz (subset-sum nad zaokrúhlenými príspevkami) –
+    # súčet ponechaných jázd najbližšie k targetu, pri rovnosti nad targetom.
+    trips, removed = trim_to_target(trips, target)
+    for removed_trip in removed[:20]:
         print(
             f"  Odstraňujem jazdu: deň {removed_trip.day_index}, "
-            f"{removed_trip.destination_name}, príspevok {removed_trip.distance_one_way * 2:.1f} km -> "
-            f"nový súčet: {best_new_sum:.1f} km (odchýlka: {best_new_sum - target:+.1f} km)"
+            f"{removed_trip.destination_name}, príspevok {removed_trip.distance_one_way * 2:.1f} km"
         )
-
-        # bezpečnostná brzda – keby sa z nejakého dôvodu už nezlepšovala situácia
-        if len(trips) == 0:
-            print("  Všetky jazdy odstránené, končím.")
-            break
+    if len(removed) > 20:
+        print(f"  ... a ďalších {len(removed) - 20} jázd.")
 
     final_sum = total_km(trips)
     print(
@@ -287,7 +368,8 @@ def final_corrector_node(state: AgentState):
     print(f"FINAL_CORRECTOR vstupný súčet: {current_km_sum:.2f} km, "
           f"cieľ: {target}, odchýlka: {diff:+.2f} km")
 
-    if current_km_sum >= target:
+    # súčet floatov (napr. 999.9999999) je presne na targete – nepridávať 0.0 km jazdu
+    if round(current_km_sum, 1) >= target:
         print("Plán je nad alebo presne na targete – nekorigujem, len posúvam ďalej.")
         final_sum = current_km_sum
         return {"ai_trip_plan": trips, "final_sum_km": final_sum, "next_step": "processor"}
@@ -308,7 +390,7 @@ def final_corrector_node(state: AgentState):
     trips.append(
         TripEntry(
             day_index=day_index_for_fill,
-            destination_name="Servisná Jazda (doladenie)",
+            destination_name=SERVICE_TRIP_NAME,
             distance_one_way=round(one_way_dist, 1),
             departure_time="14:00",
             return_departure_time="15:00",
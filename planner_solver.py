@@ -0,0 +1,346 @@
+# planner_solver.py
+"""
+Deterministický plánovač jázd – náhrada LLM plánovača (ai_planner_node).
+
+Výber jázd je ohraničený subset-sum: každá jazda prispeje 2 × vzdialenosť
+(tam a späť), mestá sa môžu opakovať, max. jedna jazda na pracovný deň.
+Dosiahnuteľné súčty pre každý počet jázd počíta bitset DP (Python int ako
+bitová množina, príspevky zaokrúhlené na km). Zvyšok do presného targetu
+sa rozdelí cez úpravu ±5 km na jazdu, ktorú povoľuje aj LLM prompt.
+Časy a popisy sú z deterministického generátora – výsledok trvá milisekundy.
+
+repair_node používa to isté DP na lokálnu opravu LLM plánu pod targetom:
+jazdy z LLM ostanú, chýbajúce km sa doplnia jazdami vo voľných pracovných
+dňoch. LLM sa volá znova, iba ak oprava neexistuje.
+"""
+import math
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models import AgentState, TripEntry, TripSchedule
+
+# max. úprava vzdialenosti jedným smerom (km) – rovnako ako v LLM prompte
+ADJUST_KM = 5.0
+
+DESCRIPTIONS = [
+    "Servis IT infraštruktúry",
+    "Kontrola technického vybavenia",
+    "Obchodné rokovanie o IT",
+    "Konzultácia vývoja softvéru",
+    "Implementácia cloud riešenia",
+    "Analýza bezpečnostných rizík",
+    "Školenie používateľov systému",
+    "Inštalácia sieťových prvkov",
+    "Audit serverovej infraštruktúry",
+    "Prezentácia nového IT riešenia",
+]
+
+
+def min_trips_needed(target_km: float, destinations: Sequence[Dict], num_workdays: int) -> int:
+    """Rovnaký odhad ako v ai_planner_node (priemerná vzdialenosť destinácií)."""
+    if destinations:
+        avg_dist = sum(c["dist"] for c in destinations) / len(destinations)
+    else:
+        avg_dist = 50.0
+    needed = math.ceil(target_km / (avg_dist * 2))
+    return max(1, min(needed, num_workdays))
+
+
+def reachable_sums(contributions: Sequence[int], max_trips: int) -> List[int]:
+    """
+    reach[k] = bitset súčtov dosiahnuteľných presne k jazdami
+    (bit s je 1, ak sa dá dosiahnuť súčet s km; mestá sa môžu opakovať).
+    """
+    reach = [1]
+    for _ in range(max_trips):
+        prev = reach[-1]
+        nxt = 0
+        for c in set(contributions):
+            nxt |= prev << c
+        reach.append(nxt)
+    return reach
+
+
+def _pick_count_and_sum(
+    reach: List[int], target: int, min_trips: int, max_trips: int
+) -> Optional[Tuple[int, int]]:
+    """
+    Vyberie (počet jázd, súčet) – primárne taký, z ktorého sa úpravou ±5 km
+    na jazdu dá trafiť target presne; potom čo najmenšia potrebná úprava,
+    potom menej jázd.
+    """
+    best = None
+    best_key = None
+    for k in range(min_trips, max_trips + 1):
+        bits = reach[k]
+        if not bits:
+            continue
+        slack = int(2 * ADJUST_KM * k)
+        # najbližší dosiahnuteľný súčet pod a nad targetom
+        below = bits & ((1 << (target + 1)) - 1)
+        candidates = []
+        if below:
+            candidates.append(below.bit_length() - 1)
+        above = bits >> (target + 1)
+        if above:
+            candidates.append(target + 1 + ((above & -above).bit_length() - 1))
+        for s in candidates:
+            miss = max(0, abs(s - target) - slack)
+            key = (miss, abs(s - target), k)
+            if best_key is None or key < best_key:
+                best, best_key = (k, s), key
+    return best
+
+
+def _reconstruct(
+    reach: List[int], contributions: Sequence[int], k: int, s: int
+) -> List[int]:
+    """
+    Spätne zostaví indexy destinácií pre (k, s). Pri voľbe preferuje doteraz
+    najmenej použité mesto, aby sa trasy striedali.
+    """
+    used: Counter = Counter()
+    chosen: List[int] = []
+    for step in range(k, 0, -1):
+        options = [
+            i for i, c in enumerate(contributions)
+            if c <= s and (reach[step - 1] >> (s - c)) & 1
+        ]
+        i = min(options, key=lambda idx: (used[idx], idx))
+        used[i] += 1
+        chosen.append(i)
+        s -= contributions[i]
+    return chosen
+
+
+def _interleave(indices: List[int]) -> List[int]:
+    # rozloží opakované mestá, aby nešli po sebe (round-robin podľa počtu)
+    groups: Dict[int, int] = Counter(indices)
+    order = sorted(groups, key=lambda i: (-groups[i], i))
+    result: List[int] = []
+    while len(result) < len(indices):
+        for i in order:
+            if groups[i]:
+                result.append(i)
+                groups[i] -= 1
+    return result
+
+
+def _tenths(km: float) -> int:
+    return int(round(km * 10))
+
+
+def _adjusted_units(bases: List[int], target: int) -> List[int]:
+    """
+    Všetko v desatinách km: bases = vzdialenosti jedným smerom, target =
+    súčet tam a späť. Rozdiel rozdelí rovnomerne medzi jazdy (max ±5 km
+    jedným smerom); nepárny zvyšok zaokrúhli nahor, aby plán nebol pod targetom.
+    """
+    units_needed = -(-(target - 2 * sum(bases)) // 2)
+    limit = int(ADJUST_KM * 10)
+    n = len(bases)
+    units_needed = max(-limit * n, min(limit * n, units_needed))
+    share, extra = divmod(abs(units_needed), n)
+    sign = 1 if units_needed >= 0 else -1
+    return [base + sign * (share + (1 if i < extra else 0)) for i, base in enumerate(bases)]
+
+
+def _spread_days(count: int, num_workdays: int) -> List[int]:
+    # jazdy rovnomerne cez mesiac, každý deň najviac raz
+    return [i * num_workdays // count for i in range(count)]
+
+
+def _times(rng: random.Random, duration_min: int) -> Tuple[str, str]:
+    """
+    Odchod 06:00–08:00, návrat tak, aby celý výjazd trval 8–13 h
+    (a na mieste ostala aspoň hodina).
+    """
+    departure = 6 * 60 + rng.randrange(0, 121, 5)
+    span = rng.randrange(8 * 60 + 30, 11 * 60 + 1, 15)
+    return_departure = departure + span - duration_min
+    return_departure = max(return_departure, departure + duration_min + 60)
+    return_departure = min(return_departure, departure + 13 * 60 - duration_min - 15)
+
+    def hhmm(minutes: int) -> str:
+        minutes = max(0, min(minutes, 23 * 60 + 55))
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+    return hhmm(departure), hhmm(return_departure)
+
+
+def solve_trip_plan(
+    destinations: Sequence[Dict],
+    target_km: float,
+    num_workdays: int,
+    min_trips: Optional[int] = None,
+    seed: Optional[str] = None,
+) -> TripSchedule:
+    """
+    Zostaví TripSchedule bez LLM:
+    - počet jázd v [min_trips, num_workdays], max. jedna jazda na deň,
+    - súčet 2 × distance_one_way čo najbližšie k target_km (typicky presne),
+    - časy a popisy z generátora so seedom (rovnaký vstup = rovnaký plán).
+    """
+    target = int(round(target_km))
+    usable = [d for d in destinations if d["dist"] > 0]
+    if target <= 0 or not usable or num_workdays <= 0:
+        return TripSchedule(plan=[], reasoning="Nie je čo plánovať (target, destinácie alebo dni chýbajú).")
+
+    if min_trips is None:
+        min_trips = min_trips_needed(target, usable, num_workdays)
+    min_trips = max(1, min(min_trips, num_workdays))
+
+    bases = [_tenths(d["dist"]) for d in usable]
+    contributions = [max(1, int(round(b / 5))) for b in bases]
+    reach = reachable_sums(contributions, num_workdays)
+    k, s = _pick_count_and_sum(reach, target, min_trips, num_workdays)
+
+    chosen = _interleave(_reconstruct(reach, contributions, k, s))
+    units = _adjusted_units([bases[i] for i in chosen], target * 10)
+    days = _spread_days(len(chosen), num_workdays)
+
+    rng = random.Random(seed)
+    plan: List[TripEntry] = []
+    for day_index, i, tenths in zip(days, chosen, units):
+        departure, return_departure = _times(rng, int(usable[i].get("dur", 60)))
+        plan.append(
+            TripEntry(
+                day_index=day_index,
+                destination_name=usable[i]["name"],
+                distance_one_way=tenths / 10,
+                departure_time=departure,
+                return_departure_time=return_departure,
+                description=rng.choice(DESCRIPTIONS),
+            )
+        )
+
+    total = 2 * sum(units) / 10
+    reasoning = (
+        f"Solver: {len(plan)} jázd (min. {min_trips}), základný súčet {s} km, "
+        f"po úprave ±{ADJUST_KM:.0f} km TOTAL_KM_REAL: {total:.1f} km (cieľ {target} km)."
+    )
+    return TripSchedule(plan=plan, reasoning=reasoning)
+
+
+def repair_plan(
+    trips: Sequence[TripEntry],
+    destinations: Sequence[Dict],
+    target_km: float,
+    num_workdays: int,
+    seed: Optional[str] = None,
+) -> Optional[List[TripEntry]]:
+    """
+    Doplní plán pod targetom jazdami vo voľných dňoch (existujúce jazdy
+    nemení, nové jazdy upraví v rozsahu ±5 km). Vráti nový zoznam jázd
+    alebo None, ak sa deficit nedá dorovnať aspoň do 50 km pod targetom.
+    """
+    # v desatinách km – súčet floatov by mohol skončiť o epsilon pod targetom
+    deficit_tenths = _tenths(target_km) - 2 * sum(_tenths(t.distance_one_way) for t in trips)
+    deficit = int(round(deficit_tenths / 10))
+    used_days = {t.day_index for t in trips}
+    free_days = [d for d in range(num_workdays) if d not in used_days]
+    usable = [d for d in destinations if d["dist"] > 0]
+    if deficit <= 0 or not free_days or not usable:
+        return None
+
+    bases = [_tenths(d["dist"]) for d in usable]
+    contributions = [max(1, int(round(b / 5))) for b in bases]
+    reach = reachable_sums(contributions, len(free_days))
+    picked = _pick_count_and_sum(reach, deficit, 1, len(free_days))
+    if picked is None:
+        return None
+    k, s = picked
+
+    chosen = _interleave(_reconstruct(reach, contributions, k, s))
+    units = _adjusted_units([bases[i] for i in chosen], deficit_tenths)
+    if deficit_tenths - 2 * sum(units) > 500:
+        return None
+
+    rng = random.Random(seed)
+    days = [free_days[i] for i in _spread_days(len(chosen), len(free_days))]
+    repaired = list(trips)
+    for day_index, i, tenths in zip(days, chosen, units):
+        departure, return_departure = _times(rng, int(usable[i].get("dur", 60)))
+        repaired.append(
+            TripEntry(
+                day_index=day_index,
+                destination_name=usable[i]["name"],
+                distance_one_way=tenths / 10,
+                departure_time=departure,
+                return_departure_time=return_departure,
+                description=rng.choice(DESCRIPTIONS),
+            )
+        )
+    return repaired
+
+
+def repair_node(state: AgentState):
+    """
+    REPAIR – medzi VALIDÁTOROM a PLANNEROM pri deficite > 50 km:
+    - oprava existuje -> doplnený plán ide späť na VALIDÁTOR,
+    - neexistuje -> AI PLANNER s feedbackom (po max. pokusoch FINAL_CORRECTOR).
+    """
+    print("--- 2b. REPAIR (doplnenie jázd do voľných dní) ---")
+
+    trips = state["ai_trip_plan"]
+    target = state["target_km"]
+    current = sum(t.distance_one_way * 2 for t in trips)
+
+    seed = f"{state['start_city']}:{state['year']}-{state['month']}:{target}:{state['retry_count']}"
+    repaired = repair_plan(
+        trips,
+        state["available_destinations"],
+        target,
+        len(state["workdays"]),
+        seed=seed,
+    )
+
+    if repaired is not None:
+        repaired_sum = sum(t.distance_one_way * 2 for t in repaired)
+        print(
+            f"Doplnených {len(repaired) - len(trips)} jázd: {current:.1f} -> {repaired_sum:.1f} km "
+            f"(cieľ {target} km), bez nového LLM volania."
+        )
+        return {"ai_trip_plan": repaired, "next_step": "validator", "feedback_message": ""}
+
+    if state["retry_count"] - 1 >= state["max_retries"]:
+        print("Oprava neexistuje a pokusy sú vyčerpané -> FINAL_CORRECTOR.")
+        return {"next_step": "final_corrector", "feedback_message": ""}
+
+    deficit = target - current
+    feedback = (
+        f"Celkový súčet km ({current:.1f}) je o {deficit:.1f} km pod cieľom {target}. "
+        "Navrhni NOVÝ plán s viac jazdami alebo dlhšími trasami. "
+        "KĽUDNE MÔŽEŠ CIEĽ PREKROČIŤ (je lepšie byť nad cieľom ako pod ním)."
+    )
+    print("Oprava neexistuje (málo voľných dní), vraciam späť na AI_PLANNER.")
+    return {"next_step": "ai_planner", "feedback_message": feedback}
+
+
+def solver_planner_node(state: AgentState):
+    """
+    Náhrada ai_planner_node – rovnaký výstup (ai_trip_plan), bez LLM.
+    """
+    print(f"--- 1. SOLVER PLANNING (Pokus: {state['retry_count']}) ---")
+
+    started = time.perf_counter()
+    seed = f"{state['start_city']}:{state['year']}-{state['month']}:{state['target_km']}"
+    schedule = solve_trip_plan(
+        state["available_destinations"],
+        state["target_km"],
+        len(state["workdays"]),
+        seed=seed,
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print(f"Solver Reasoning: {schedule.reasoning}")
+    print(f"Solver naplánoval {len(schedule.plan)} jázd za {elapsed_ms:.1f} ms.")
+
+    return {
+        "ai_trip_plan": schedule.plan,
+        "retry_count": state["retry_count"] + 1,
+        "feedback_message": "",
+        "next_step": "validator",
+    }
@@ -0,0 +1,194 @@
+# prefilter.py
+"""
+Vektorizovaný prefilter kandidátskych miest pred akýmkoľvek OSRM volaním.
+
+Vzdušná vzdialenosť (haversine, NumPy naraz pre všetkých kandidátov) krát
+detour faktor kalibrovaný z uložených dvojíc (road/air v city_pairs) dáva
+odhad cestnej vzdialenosti. Kandidáti, ktorí pláne nemôžu pomôcť (jedna jazda
+tam a späť prekročí cieľ aj s toleranciou, alebo sú prakticky na mieste),
+sa vyradia ešte pred routovaním.
+
+V režime PLANNING_MODE=estimate sa plánuje priamo nad odhadmi a routujú sa
+iba mestá, ktoré finálny plán naozaj použije (apply_routed_distances).
+"""
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+import dbcache
+from config import (
+    PREFILTER_MIN_KM,
+    DETOUR_DEFAULT,
+    DETOUR_DEFAULT_KMH,
+    DETOUR_MIN_SAMPLES,
+    DETOUR_MAX_SAMPLES,
+    DETOUR_RECALIBRATE_SECONDS,
+)
+from gazetteer import EARTH_RADIUS_KM, get_gazetteer
+from models import TripEntry, SERVICE_TRIP_NAME
+
+# tolerancia plánu (validator/trimmer pracujú s ±50 km)
+TOLERANCE_KM = 50.0
+# planner môže upraviť vzdialenosť o ±5 km na mesto
+ADJUST_KM = 5.0
+
+
+class DetourModel(NamedTuple):
+    factor: float   # medián road/air
+    low: float      # 10. percentil road/air – konzervatívny odhad pre vyraďovanie
+    kmh: float      # medián priemernej rýchlosti
+    samples: int
+
+
+_model: Optional[DetourModel] = None
+_model_at = 0.0
+
+
+def haversine_km(lat0: float, lon0: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Vzdušné vzdialenosti (km) z jedného bodu do poľa bodov."""
+    phi0 = np.radians(lat0)
+    phi = np.radians(lats)
+    dphi = phi - phi0
+    dlmb = np.radians(lons) - np.radians(lon0)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi0) * np.cos(phi) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def calibrate_detour(max_samples: int = DETOUR_MAX_SAMPLES) -> DetourModel:
+    """
+    Kalibruje road/air pomer a priemernú rýchlosť z uložených dvojíc.
+    Pri malom počte vzoriek vráti default (DETOUR_DEFAULT, DETOUR_DEFAULT_KMH).
+    """
+    rows = dbcache.get_air_road_samples(max_samples)
+    if len(rows) < DETOUR_MIN_SAMPLES:
+        return DetourModel(DETOUR_DEFAULT, 1.0, DETOUR_DEFAULT_KMH, len(rows))
+
+    data = np.asarray(rows, dtype=np.float64)
+    air, road, seconds = data[:, 0], data[:, 1], data[:, 2]
+    ratio = road / air
+    # zahodíme nezmysly (trajekt, chybný geocode)
+    ratio = ratio[(ratio >= 1.0) & (ratio <= 4.0)]
+    if len(ratio) < DETOUR_MIN_SAMPLES:
+        return DetourModel(DETOUR_DEFAULT, 1.0, DETOUR_DEFAULT_KMH, len(ratio))
+
+    kmh = road / 1000.0 / (seconds / 3600.0)
+    return DetourModel(
+        factor=float(np.median(ratio)),
+        low=float(np.percentile(ratio, 10)),
+        kmh=float(np.median(kmh)),
+        samples=len(ratio),
+    )
+
+
+def get_detour_model() -> DetourModel:
+    global _model, _model_at
+    if _model is None or time.monotonic() - _model_at > DETOUR_RECALIBRATE_SECONDS:
+        _model = calibrate_detour()
+        _model_at = time.monotonic()
+        print(
+            f"[PREFILTER] Detour faktor {_model.factor:.3f} (p10 {_model.low:.3f}), "
+            f"{_model.kmh:.0f} km/h z {_model.samples} dvojíc."
+        )
+    return _model
+
+
+def _city_coords(cities: Sequence[str]) -> Dict[str, Tuple[float, float]]:
+    # gazetteer (offline), inak súradnice z distances.db
+    gazetteer = get_gazetteer()
+    coords: Dict[str, Tuple[float, float]] = {}
+    unknown: List[str] = []
+    for city in cities:
+        place = gazetteer.locate(city)
+        if place:
+            coords[city] = (place.lat, place.lon)
+        else:
+            unknown.append(city)
+    if unknown:
+        coords.update(dbcache.get_city_coords_bulk(unknown))
+    return coords
+
+
+def estimate_distances(start_city: str, cities: Sequence[str]) -> Dict[str, Tuple[float, float]]:
+    """
+    { mesto: (air_km, odhad road_km) } pre mestá so známymi súradnicami.
+    Ak súradnice východzieho mesta nie sú známe, vráti prázdny dict.
+    """
+    coords = _city_coords([start_city, *cities])
+    if start_city not in coords:
+        return {}
+
+    known = [city for city in cities if city in coords]
+    if not known:
+        return {}
+
+    lat0, lon0 = coords[start_city]
+    points = np.asarray([coords[city] for city in known], dtype=np.float64)
+    air = haversine_km(lat0, lon0, points[:, 0], points[:, 1])
+    road = air * get_detour_model().factor
+    return {city: (float(a), float(r)) for city, a, r in zip(known, air, road)}
+
+
+def prefilter_candidates(start_city: str, candidates: List[str], target_km: float) -> List[str]:
+    """
+    Vyradí kandidátov, ktorí pláne zjavne nepomôžu:
+    - jedna jazda tam a späť (konzervatívny odhad) prekročí target + 50 km,
+    - odhad jedným smerom je kratší ako PREFILTER_MIN_KM.
+    Mestá bez známych súradníc ponechá.
+    """
+    estimates = estimate_distances(start_city, candidates)
+    if not estimates:
+        return candidates
+
+    model = get_detour_model()
+    kept: List[str] = []
+    for city in candidates:
+        if city not in estimates:
+            kept.append(city)
+            continue
+        air_km, road_km = estimates[city]
+        if 2 * air_km * model.low > target_km + TOLERANCE_KM:
+            print(f"[PREFILTER] Vyraďujem {city}: ~{road_km:.0f} km jedným smerom je nad cieľ.")
+        elif road_km < PREFILTER_MIN_KM:
+            print(f"[PREFILTER] Vyraďujem {city}: ~{road_km:.1f} km – príliš blízko.")
+        else:
+            kept.append(city)
+
+    print(f"[PREFILTER] {len(kept)} z {len(candidates)} kandidátov ide na routovanie.")
+    return kept
+
+
+def estimate_city_map(start_city: str, candidates: List[str]) -> Dict[str, Tuple[float, int]]:
+    """
+    city_map z odhadov { mesto: (road_km, duration_min) } pre PLANNING_MODE=estimate.
+    """
+    kmh = get_detour_model().kmh
+    return {
+        city: (round(road_km, 1), int(road_km / kmh * 60))
+        for city, (_, road_km) in estimate_distances(start_city, candidates).items()
+    }
+
+
+def apply_routed_distances(
+    trips: List[TripEntry],
+    estimates: Dict[str, Tuple[float, int]],
+    routed: Dict[str, Tuple[float, int]],
+) -> List[TripEntry]:
+    """
+    Nahradí odhadnuté km v pláne reálnymi (routed). Úprava plánovača (±5 km
+    voči odhadu) sa zachová. Jazdy do miest, ktoré sa nepodarilo zroutovať,
+    sa vyradia; servisná jazda sa vyradí tiež – FINAL_CORRECTOR ju prepočíta.
+    """
+    refined: List[TripEntry] = []
+    for trip in trips:
+        name = trip.destination_name
+        if name == SERVICE_TRIP_NAME:
+            continue
+        if name in routed:
+            delta = trip.distance_one_way - estimates.get(name, (trip.distance_one_way, 0))[0]
+            delta = max(-ADJUST_KM, min(ADJUST_KM, delta))
+            distance = round(max(routed[name][0] + delta, 0.0), 1)
+            refined.append(trip.model_copy(update={"distance_one_way": distance}))
+        else:
+            print(f"[PREFILTER] {name} sa nepodarilo zroutovať – jazda deň {trip.day_index} vypadáva.")
+    return refined
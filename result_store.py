@@ -0,0 +1,305 @@
+# result_store.py
+"""
+Úložisko vygenerovaných kníh jázd (CSV, XLSX, HTML tabuľka) pod job_id.
+
+- "memory": LRU v procese, ohraničená počtom záznamov, veľkosťou a TTL,
+- "sqlite": zdieľaný súbor (WAL) – každý uvicorn worker vidí všetky joby,
+  eviction podľa TTL a posledného prístupu (LRU) pri zápise.
+
+Textové časti sa ukladajú ako zlib-komprimovaný JSON; XLSX je už ZIP,
+ukladá sa bez ďalšej kompresie. stats() vracia veľkosť a metriky eviction.
+
+Zlyhaný job sa ukladá ako značka s chybou (put_failure), aby ho videli aj
+ostatné workery. status() je lacný dotaz na stav (bez dekompresie a zápisu)
+pre polling /jobs/{id}.
+"""
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from config import (
+    RESULT_STORE_BACKEND,
+    RESULT_STORE_PATH,
+    RESULT_STORE_MAX_ENTRIES,
+    RESULT_STORE_MAX_MB,
+    RESULT_STORE_TTL_SECONDS,
+)
+from jobs import DONE, FAILED
+
+
+def _encode(result: Dict[str, Any]) -> Tuple[bytes, bytes, int]:
+    """(komprimované meta, xlsx, pôvodná veľkosť v bajtoch)."""
+    xlsx = bytes(result.get("xlsx") or b"")
+    text = json.dumps(
+        {k: v for k, v in result.items() if k != "xlsx"}, ensure_ascii=False, default=float
+    ).encode("utf-8")
+    return zlib.compress(text, 6), xlsx, len(text) + len(xlsx)
+
+
+def _decode(meta: bytes, xlsx: bytes) -> Dict[str, Any]:
+    result = json.loads(zlib.decompress(meta).decode("utf-8"))
+    result["xlsx"] = bytes(xlsx)
+    return result
+
+
+class _Metrics:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.raw_bytes = 0      # súčet veľkostí pred kompresiou (uložené v tomto procese)
+        self.stored_bytes = 0   # ... a po kompresii
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "compression_ratio": round(self.raw_bytes / self.stored_bytes, 2) if self.stored_bytes else None,
+        }
+
+
+class MemoryResultStore:
+    """LRU + TTL v pamäti procesu (jeden worker)."""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # job_id -> (created_at, meta, xlsx, chyba zlyhaného jobu alebo None)
+        self._data: "OrderedDict[str, Tuple[float, bytes, bytes, Optional[str]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.metrics = _Metrics()
+
+    def _drop(self, job_id: str) -> None:
+        _, meta, xlsx, _ = self._data.pop(job_id)
+        self._bytes -= len(meta) + len(xlsx)
+
+    def put(self, job_id: str, result: Dict[str, Any]) -> None:
+        meta, xlsx, raw = _encode(result)
+        self._store(job_id, meta, xlsx, None)
+        with self._lock:
+            self.metrics.raw_bytes += raw
+            self.metrics.stored_bytes += len(meta) + len(xlsx)
+
+    def put_failure(self, job_id: str, error: str) -> None:
+        self._store(job_id, b"", b"", error)
+
+    def _store(self, job_id: str, meta: bytes, xlsx: bytes, error: Optional[str]) -> None:
+        with self._lock:
+            if job_id in self._data:
+                self._drop(job_id)
+            self._data[job_id] = (time.time(), meta, xlsx, error)
+            self._bytes += len(meta) + len(xlsx)
+            while len(self._data) > 1 and (
+                len(self._data) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._drop(next(iter(self._data)))
+                self.metrics.evictions += 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._data.get(job_id)
+            if item is None or item[3] is not None:
+                self.metrics.misses += 1
+                return None
+            if self.ttl and time.time() - item[0] > self.ttl:
+                self._drop(job_id)
+                self.metrics.expirations += 1
+                self.metrics.misses += 1
+                return None
+            self._data.move_to_end(job_id)
+            self.metrics.hits += 1
+        return _decode(item[1], item[2])
+
+    def status(self, job_id: str) -> Optional[Tuple[str, Optional[str]]]:
+        """(DONE, None) | (FAILED, chyba) | None – bez dekompresie a bez LRU posunu."""
+        with self._lock:
+            item = self._data.get(job_id)
+        if item is None or (self.ttl and time.time() - item[0] > self.ttl):
+            return None
+        return (DONE, None) if item[3] is None else (FAILED, item[3])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                **self.metrics.as_dict(),
+            }
+
+
+class SQLiteResultStore:
+    """
+    Zdieľané úložisko v SQLite súbore. Počty záznamov/bajtov v stats() sú
+    za celý súbor, hits/misses/evictions za aktuálny proces.
+    """
+
+    def __init__(self, path: Path, max_entries: int, max_bytes: int, ttl: float):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        self._metrics_lock = threading.Lock()
+        self.metrics = _Metrics()
+        self._init_db()
+
+    def _conn(self) -> sqlite3.Connection:
+        # jedno spojenie na vlákno (rovnako ako dbcache)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS results (
+                    job_id TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    meta BLOB NOT NULL,
+                    xlsx BLOB NOT NULL,
+                    error TEXT
+                )
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(results)")}
+            if "error" not in columns:
+                conn.execute("ALTER TABLE results ADD COLUMN error TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed_at)")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> Tuple[int, int]:
+        expired = 0
+        if self.ttl:
+            expired = conn.execute(
+                "DELETE FROM results WHERE created_at < ?", (now - self.ttl,)
+            ).rowcount
+
+        entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        evicted = []
+        if entries > self.max_entries or total > self.max_bytes:
+            # najdlhšie nepoužité ako prvé, posledný záznam ostane vždy
+            for job_id, size in conn.execute(
+                "SELECT job_id, size FROM results ORDER BY accessed_at LIMIT ?", (entries - 1,)
+            ):
+                if entries <= self.max_entries and total <= self.max_bytes:
+                    break
+                evicted.append((job_id,))
+                entries -= 1
+                total -= size
+            conn.executemany("DELETE FROM results WHERE job_id = ?", evicted)
+        return expired, len(evicted)
+
+    def put(self, job_id: str, result: Dict[str, Any]) -> None:
+        meta, xlsx, raw = _encode(result)
+        self._store(job_id, meta, xlsx, None)
+        with self._metrics_lock:
+            self.metrics.raw_bytes += raw
+            self.metrics.stored_bytes += len(meta) + len(xlsx)
+
+    def put_failure(self, job_id: str, error: str) -> None:
+        self._store(job_id, b"", b"", error)
+
+    def _store(self, job_id: str, meta: bytes, xlsx: bytes, error: Optional[str]) -> None:
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO results (job_id, created_at, accessed_at, size, meta, xlsx, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (job_id, now, now, len(meta) + len(xlsx), meta, xlsx, error),
+            )
+            expired, evicted = self._evict(conn, now)
+        with self._metrics_lock:
+            self.metrics.expirations += expired
+            self.metrics.evictions += evicted
+        if expired or evicted:
+            print(f"[RESULTS] Vyradených {evicted} (LRU) a {expired} (TTL) výsledkov.")
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT created_at, meta, xlsx FROM results WHERE job_id = ? AND error IS NULL", (job_id,)
+        ).fetchone()
+
+        expired = row is not None and self.ttl and now - row[0] > self.ttl
+        with self._metrics_lock:
+            if row is None or expired:
+                self.metrics.misses += 1
+                self.metrics.expirations += int(bool(expired))
+            else:
+                self.metrics.hits += 1
+
+        if row is None:
+            return None
+        with conn:
+            if expired:
+                conn.execute("DELETE FROM results WHERE job_id = ?", (job_id,))
+                return None
+            conn.execute("UPDATE results SET accessed_at = ? WHERE job_id = ?", (now, job_id))
+        return _decode(row[1], row[2])
+
+    def status(self, job_id: str) -> Optional[Tuple[str, Optional[str]]]:
+        """(DONE, None) | (FAILED, chyba) | None – iba index, bez dekompresie a bez zápisu."""
+        row = self._conn().execute(
+            "SELECT created_at, error FROM results WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None or (self.ttl and time.time() - row[0] > self.ttl):
+            return None
+        return (DONE, None) if row[1] is None else (FAILED, row[1])
+
+    def stats(self) -> Dict[str, Any]:
+        entries, total = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+        with self._metrics_lock:
+            metrics = self.metrics.as_dict()
+        return {
+            "backend": "sqlite",
+            "path": str(self.path),
+            "entries": entries,
+            "bytes": total,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            **metrics,
+        }
+
+
+def create_result_store(backend: str = RESULT_STORE_BACKEND):
+    max_bytes = int(RESULT_STORE_MAX_MB * 2**20)
+    if backend == "sqlite":
+        return SQLiteResultStore(
+            Path(RESULT_STORE_PATH), RESULT_STORE_MAX_ENTRIES, max_bytes, RESULT_STORE_TTL_SECONDS
+        )
+    if backend == "memory":
+        return MemoryResultStore(RESULT_STORE_MAX_ENTRIES, max_bytes, RESULT_STORE_TTL_SECONDS)
+    raise ValueError(f"Neznámy RESULT_STORE_BACKEND: {backend!r} (memory | sqlite)")
+
+
+result_store = create_result_store()
@@ -0,0 +1,134 @@
+# route_refresher.py
+"""
+Background refresh starých trás v city_distances (stale-while-revalidate).
+
+Requesty vždy dostanú hodnotu z cache okamžite; tento task na pozadí nájde
+riadky staršie ako REFRESH_MAX_AGE_DAYS, prepočíta ich cez MCP/OSRM
+(pomaly, max. jedno volanie za REFRESH_MIN_DELAY sekúnd) a prepíše ich na mieste.
+
+Refresher beží v každom uvicorn workeri, kolo však robí iba ten, kto získa
+lease "route_refresh" v distances.db (platí REFRESH_INTERVAL) – spolu teda
+najviac jedno kolo za interval. Zlyhané obnovy sa ukladajú do failed_lookups
+s TTL a get_stale_pairs ich vynechá.
+"""
+import asyncio
+from typing import Dict, List
+from uuid import uuid4
+
+from config import (
+    REFRESH_MAX_AGE_DAYS,
+    REFRESH_INTERVAL,
+    REFRESH_BATCH_SIZE,
+    REFRESH_MIN_DELAY,
+)
+from dbcache_async import distance_cache
+from mcp_client import fetch_driving_matrix
+
+LEASE_NAME = "route_refresh"
+
+
+class RouteRefresher:
+    def __init__(
+        self,
+        max_age_days: float = 90,
+        interval: float = 600,
+        batch_size: int = 50,
+        min_delay: float = 5,
+    ):
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.interval = interval
+        self.batch_size = batch_size
+        self.min_delay = min_delay
+
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+        # identita pre lease – unikátna pre proces aj inštanciu
+        self._owner = uuid4().hex
+
+        self.refreshed = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        print(
+            f"[REFRESH] Štartujem refresher (staršie ako {self.max_age_seconds / 86400:.0f} dní, "
+            f"každých {self.interval:.0f} s)."
+        )
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._loop(), name="route-refresher")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[REFRESH] Chyba refreshu: {e}")
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_once(self) -> int:
+        """
+        Jedno kolo refreshu – vráti počet obnovených trás (0 aj vtedy,
+        keď kolo práve robí iný worker).
+        """
+        if not await distance_cache.acquire_lease(LEASE_NAME, self._owner, self.interval):
+            return 0
+
+        stale = await distance_cache.get_stale_pairs(self.max_age_seconds, self.batch_size)
+        if not stale:
+            return 0
+
+        # jedno driving_matrix volanie na východzie mesto
+        by_origin: Dict[str, List[str]] = {}
+        for city1, city2 in stale:
+            by_origin.setdefault(city1, []).append(city2)
+
+        print(f"[REFRESH] Obnovujem {len(stale)} trás z {len(by_origin)} miest.")
+
+        refreshed = 0
+        for i, (origin, destinations) in enumerate(by_origin.items()):
+            if i:
+                await asyncio.sleep(self.min_delay)
+                # dlhé kolo – predĺžime lease; ak ho medzitým prevzal iný worker, končíme
+                if not await distance_cache.acquire_lease(LEASE_NAME, self._owner, self.interval):
+                    print("[REFRESH] Lease prevzal iný worker, končím kolo.")
+                    break
+
+            results, failures = await fetch_driving_matrix(origin, destinations)
+            refreshed += await distance_cache.update_mcp_records_bulk(results)
+
+            for dest_city, (_, reason) in failures.items():
+                print(f"[REFRESH] {origin} → {dest_city} sa nepodarilo obnoviť: {reason}")
+            await distance_cache.save_refresh_failures(
+                origin, {dest_city: reason for dest_city, (_, reason) in failures.items()}
+            )
+            self.failed += len(failures)
+
+        self.refreshed += refreshed
+        print(f"[REFRESH] Obnovených {refreshed} trás.")
+        return refreshed
+
+
+route_refresher = RouteRefresher(
+    max_age_days=REFRESH_MAX_AGE_DAYS,
+    interval=REFRESH_INTERVAL,
+    batch_size=REFRESH_BATCH_SIZE,
+    min_delay=REFRESH_MIN_DELAY,
+)
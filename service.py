@@ -1,15 +1,112 @@
 # service.py
 import io
-from typing import Tuple
+from typing import Callable, Dict, Optional, Tuple
 
 import pandas as pd
 
-from models import AgentState
-from llm_cities import get_candidate_cities_from_llm
+from config import PLANNING_MODE, PREFILTER_ENABLED
+from models import AgentState, SERVICE_TRIP_NAME
+from gazetteer import aget_candidate_cities
 from mcp_client import get_map_data_from_mcp
+from dbcache_async import distance_cache
 from map_service import MapService
+from prefilter import apply_routed_distances, estimate_city_map, prefilter_candidates
 from utils import get_workdays
-from workflow import build_workflow
+from workflow import get_workflow
+
+# progress(stage, detail) – hlásenie priebehu (jobs.Job.report)
+Progress = Callable[[str, str], None]
+
+
+async def _run_graph(app, inputs: AgentState, progress: Optional[Progress]) -> AgentState:
+    """app.ainvoke; s progress cez astream a hlásenie po každom uzle grafu."""
+    if progress is None:
+        return await app.ainvoke(inputs)
+
+    result = inputs
+    async for mode, chunk in app.astream(inputs, stream_mode=["updates", "values"]):
+        if mode == "values":
+            result = chunk
+            continue
+        for node, update in chunk.items():
+            progress(node, (update or {}).get("next_step", ""))
+    return result
+
+
+async def prepare_city_map(
+    start_city: str,
+    target_km: float,
+    candidate_source: Optional[str] = None,
+    planning_mode: Optional[str] = None,
+    refresh_candidates: bool = False,
+) -> Tuple[Optional[Dict[str, Tuple[float, int]]], Optional[Dict[str, Tuple[float, int]]]]:
+    """
+    Kandidátske mestá -> prefilter -> city_map pre plánovač.
+    Vráti (city_map, estimates); estimates je None okrem PLANNING_MODE=estimate,
+    kde city_map obsahuje odhady (a reálne km z DB, kde už sú).
+    Pri zlyhaní vráti (None, None) – MapService použije statický fallback.
+    refresh_candidates obíde cache LLM zoznamov miest.
+    """
+    try:
+        # gazetteer je offline; LLM cez ainvoke (neblokuje event loop)
+        candidate_cities = await aget_candidate_cities(start_city, candidate_source, refresh_candidates)
+        # prefilter a odhady čítajú z distances.db (súradnice, kalibrácia) – mimo event loopu
+        if PREFILTER_ENABLED:
+            candidate_cities = await distance_cache.run_read(
+                prefilter_candidates, start_city, candidate_cities, target_km
+            )
+
+        if (planning_mode or PLANNING_MODE) == "estimate":
+            estimates = await distance_cache.run_read(estimate_city_map, start_city, candidate_cities)
+            estimates.update(await distance_cache.get_distances_bulk(start_city, list(estimates)))
+            if estimates:
+                print(f"[service] Plánujem nad odhadmi pre {len(estimates)} miest.")
+                return estimates, estimates
+            print("[service] Bez súradníc kandidátov – routujem všetkých.")
+
+        # MCP volanie – async, preto await
+        return await get_map_data_from_mcp(start_city, candidate_cities), None
+    except Exception as e:
+        print(f"[service] VAROVANIE: MCP/LLM zlyhalo: {e}")
+        print("[service] Použijem statické fallback mapové dáta.")
+        return None, None
+
+
+async def refine_with_routes(
+    result: AgentState,
+    estimates: Dict[str, Tuple[float, int]],
+    planner: Optional[str] = None,
+    progress: Optional[Progress] = None,
+) -> AgentState:
+    """
+    PLANNING_MODE=estimate: zroutuje iba mestá použité v pláne, nahradí odhady
+    reálnymi km a plán znova prejde validátorom (trimmer / korektor / processor).
+    """
+    start_city = result["start_city"]
+    used = list(
+        dict.fromkeys(
+            trip.destination_name
+            for trip in result["ai_trip_plan"]
+            if trip.destination_name != SERVICE_TRIP_NAME
+        )
+    )
+    print(f"[service] Routujem {len(used)} z {len(estimates)} miest použitých v pláne: {used}")
+
+    try:
+        routed = await get_map_data_from_mcp(start_city, used) if used else {}
+    except Exception as e:
+        print(f"[service] VAROVANIE: routovanie plánu zlyhalo ({e}), ponechávam odhady.")
+        return result
+
+    refined: AgentState = {
+        **result,
+        "ai_trip_plan": apply_routed_distances(result["ai_trip_plan"], estimates, routed),
+        "available_destinations": MapService(routed).get_destinations(start_city)
+        if routed
+        else result["available_destinations"],
+        "feedback_message": "",
+    }
+    return await _run_graph(get_workflow(entry_point="validator", planner=planner), refined, progress)
 
 
 async def run_logbook(
@@ -18,6 +115,11 @@ async def run_logbook(
     end_odo: int,
     month: int,
     year: int,
+    candidate_source: Optional[str] = None,
+    planning_mode: Optional[str] = None,
+    refresh_candidates: bool = False,
+    planner: Optional[str] = None,
+    progress: Optional[Progress] = None,
 ) -> Tuple[pd.DataFrame, str, bytes]:
     """
     Spustí celý workflow a vráti:
@@ -25,6 +127,12 @@ async def run_logbook(
       - CSV obsah (string)
       - XLSX obsah (bytes)
 
+    candidate_source: "gazetteer" | "llm" (default podľa CANDIDATE_SOURCE v configu)
+    planning_mode: "routed" | "estimate" (default podľa PLANNING_MODE v configu)
+    refresh_candidates: True = nové LLM volanie aj keď je zoznam miest v cache
+    planner: "llm" | "speculative" | "solver" (default podľa PLANNER v configu)
+    progress: callback(stage, detail) – priebeh po krokoch a uzloch grafu
+
     Je ASYNC, takže sa volá z FastAPI endpointu ako:
         df, csv_str, xlsx_bytes = await run_logbook(...)
     """
@@ -53,24 +161,26 @@ async def run_logbook(
     inputs["target_km"] = end_odo - start_odo
     print(f"[service] target_km = {inputs['target_km']} km")
 
-    # --- 2. LLM kandidátske mestá + MCP mapové dáta ---
-    city_map = None
-    try:
-        # LLM výber miest – sync volanie OpenAI
-        candidate_cities = get_candidate_cities_from_llm(start_city)
-
-        # MCP volanie – async, preto await
-        city_map = await get_map_data_from_mcp(start_city, candidate_cities)
-    except Exception as e:
-        print(f"[service] VAROVANIE: MCP/LLM zlyhalo: {e}")
-        print("[service] Použijem statické fallback mapové dáta.")
+    # --- 2. Kandidátske mestá (gazetteer / LLM) + prefilter + mapové dáta ---
+    if progress:
+        progress("map_data", start_city)
+    city_map, estimates = await prepare_city_map(
+        start_city, inputs["target_km"], candidate_source, planning_mode, refresh_candidates
+    )
 
     # --- 3. MapService + LangGraph workflow ---
     map_tool = MapService(city_map)
     inputs["available_destinations"] = map_tool.get_destinations(start_city)
 
-    app = build_workflow()
-    result = app.invoke(inputs)  # LangGraph je synchronný
+    app = get_workflow(planner=planner)
+    # async uzly (LLM cez ainvoke) – súbežné /generate requesty sa na workeri striedajú
+    result = await _run_graph(app, inputs, progress)
+
+    # plán nad odhadmi -> reálne trasy iba pre použité mestá
+    if estimates:
+        if progress:
+            progress("refine", f"{len(estimates)} odhadov")
+        result = await refine_with_routes(result, estimates, planner, progress)
 
     csv_str = result["final_csv"]
 
@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+import dbcache
+from dbcache_async import AsyncDistanceCache
+
+
+def _record(city1: str, city2: str, km: float) -> dict:
+    return {
+        "city1": city1,
+        "city2": city2,
+        "driving_time_seconds": int(km * 60),
+        "driving_time_human": "",
+        "distance_km_road": km,
+        "distance_km_air": km * 0.8,
+    }
+
+
+def test_read_latency_stays_flat_during_bulk_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(dbcache, "DB_PATH", tmp_path / "distances.db")
+    dbcache.init_db()
+
+    cities = [f"Mesto {i}" for i in range(10)]
+    dbcache.save_mcp_records_bulk(_record("Vrbové", c, 10.0 + i) for i, c in enumerate(cities))
+
+    bulk = [_record(f"Zdroj {i}", f"Cieľ {i}", 50.0) for i in range(200_000)]
+    cache = AsyncDistanceCache(readers=4)
+
+    async def read_latencies(n: int) -> list:
+        latencies = []
+        for _ in range(n):
+            started = time.perf_counter()
+            found = await cache.get_distances_bulk("Vrbové", cities)
+            latencies.append(time.perf_counter() - started)
+            assert len(found) == len(cities)
+        return latencies
+
+    async def loop_lag(stop: asyncio.Event) -> float:
+        # meria, ako dlho event loop nereaguje (blokujúci kód na loope)
+        worst = 0.0
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            worst = max(worst, time.perf_counter() - started - 0.005)
+        return worst
+
+    async def scenario():
+        baseline = await read_latencies(20)
+
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(loop_lag(stop))
+        write = asyncio.ensure_future(cache.save_mcp_records_bulk(bulk))
+        await asyncio.sleep(0.01)
+
+        during = await read_latencies(20)
+        write_done_before_reads = write.done()
+
+        saved = await write
+        stop.set()
+        worst_lag = await lag_task
+        return baseline, during, write_done_before_reads, saved, worst_lag
+
+    try:
+        baseline, during, write_done_before_reads, saved, worst_lag = asyncio.run(scenario())
+    finally:
+        cache.close()
+
+    assert saved == len(bulk)
+    # čítania sa dokončili počas prebiehajúceho zápisu, nečakali naň
+    assert not write_done_before_reads
+    # event loop nebol blokovaný zápisom (sync zápis na loope ho zastaví na sekundy;
+    # writer vlákno drží GIL pri spracovaní riadkov, preto rezerva nad ~0.1 s)
+    assert worst_lag < 0.5
+    # latencia čítania zostala plochá (žiadne čakanie na zápisový zámok)
+    assert max(during) < max(0.1, 20 * max(baseline))
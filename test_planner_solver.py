@@ -0,0 +1,73 @@
+import random
+
+from models import TripEntry
+from nodes import final_corrector_node
+from planner_solver import min_trips_needed, repair_plan, solve_trip_plan
+
+
+def _destinations(rng: random.Random) -> list:
+    return [
+        {"name": f"Mesto {i}", "dist": round(rng.uniform(8, 120), 1), "dur": rng.randint(15, 120)}
+        for i in range(rng.randint(3, 12))
+    ]
+
+
+def _total(trips) -> float:
+    return sum(t.distance_one_way * 2 for t in trips)
+
+
+def _corrected(trips, target: float, workdays: int) -> list:
+    state = {"ai_trip_plan": list(trips), "target_km": target, "workdays": ["deň"] * workdays}
+    return final_corrector_node(state)["ai_trip_plan"]
+
+
+def test_solver_plans_hit_target_exactly():
+    rng = random.Random(18)
+    for run in range(300):
+        destinations = _destinations(rng)
+        workdays = rng.randint(15, 23)
+        target = rng.randint(300, 2500)
+
+        plan = solve_trip_plan(destinations, target, workdays, seed=str(run)).plan
+
+        days = [t.day_index for t in plan]
+        assert len(days) == len(set(days))
+        assert all(0 <= d < workdays for d in days)
+        assert len(plan) >= min_trips_needed(target, destinations, workdays)
+        if abs(_total(plan) - target) < 50:
+            # ±5 km na jazdu stačí -> súčet presne (nie o epsilon pod targetom)
+            assert round(_total(plan), 1) == target
+            assert _corrected(plan, target, workdays) == plan
+
+
+def test_repair_fills_free_days_to_target():
+    rng = random.Random(20)
+    for run in range(300):
+        destinations = _destinations(rng)
+        workdays = rng.randint(15, 23)
+        used = rng.sample(range(workdays), rng.randint(1, workdays // 2))
+        trips = [
+            TripEntry(
+                day_index=d,
+                destination_name="LLM",
+                distance_one_way=round(rng.uniform(10, 60), 1),
+                departure_time="07:00",
+                return_departure_time="16:00",
+                description="Servis IT infraštruktúry",
+            )
+            for d in used
+        ]
+        target = int(_total(trips)) + rng.randint(60, 900)
+
+        repaired = repair_plan(trips, destinations, target, workdays, seed=str(run))
+        if repaired is None:
+            continue
+
+        days = [t.day_index for t in repaired]
+        assert len(days) == len(set(days))
+        assert all(0 <= d < workdays for d in days)
+        assert repaired[: len(trips)] == trips
+        diff = _total(repaired) - target
+        assert diff >= -50
+        # FINAL_CORRECTOR nesmie doplniť 0.0 km servisnú jazdu
+        assert all(t.distance_one_way > 0 for t in _corrected(repaired, target, workdays))
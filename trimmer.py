@@ -0,0 +1,137 @@
+# trimmer.py
+"""
+Optimálny výber jázd na odstránenie pre PY_TRIMMER.
+
+Ktoré jazdy ponechať, aby súčet 2 × distance_one_way bol čo najbližšie
+k targetu, je subset-sum. Príspevky sa zaokrúhlia na celé km a zoskupia
+podľa hodnoty (v pláne sa tie isté mestá opakujú), skupiny sa rozložia
+binárne (1, 2, 4, … kusov) a dosiahnuteľné súčty drží bitset v Python int.
+Čas ~ O(Σ log(počet v skupine) × súčet / 64) – aj pre tisíce jázd
+zo zlúčených viacmesačných plánov v milisekundách.
+"""
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+from models import TripEntry
+
+
+def _contribution(trip: TripEntry) -> float:
+    return trip.distance_one_way * 2
+
+
+def _split_counts(count: int) -> List[int]:
+    # 13 -> [1, 2, 4, 6]: každý počet 0..13 je súčtom niektorých častí
+    parts = []
+    size = 1
+    while count > 0:
+        part = min(size, count)
+        parts.append(part)
+        count -= part
+        size *= 2
+    return parts
+
+
+def _best_sum(bits: int, target: int) -> int:
+    """Dosiahnuteľný súčet najbližšie k targetu, pri rovnosti ten nad targetom."""
+    below = bits & ((1 << (target + 1)) - 1)
+    best_below = below.bit_length() - 1 if below else None
+    above = bits >> target
+    best_above = target + (above & -above).bit_length() - 1 if above else None
+
+    if best_below is None:
+        return best_above
+    if best_above is None:
+        return best_below
+    return best_above if best_above - target <= target - best_below else best_below
+
+
+def select_kept_counts(groups: Dict[int, int], target: int) -> Tuple[Dict[int, int], int]:
+    """
+    groups = { príspevok_km: počet jázd }. Vráti ({ príspevok_km: koľko ponechať },
+    súčet ponechaných km) – súčet najbližšie k targetu, pri rovnosti nad ním.
+    """
+    items: List[Tuple[int, int]] = [
+        (value, part) for value, count in sorted(groups.items()) for part in _split_counts(count)
+    ]
+
+    # layers[i] = dosiahnuteľné súčty z prvých i položiek (pre spätnú rekonštrukciu)
+    layers = [1]
+    for value, part in items:
+        layers.append(layers[-1] | (layers[-1] << (value * part)))
+
+    total = _best_sum(layers[-1], max(target, 0))
+
+    kept: Dict[int, int] = defaultdict(int)
+    s = total
+    for i in range(len(items), 0, -1):
+        if (layers[i - 1] >> s) & 1:
+            continue  # súčet dosiahnuteľný aj bez i-tej položky
+        value, part = items[i - 1]
+        kept[value] += part
+        s -= value * part
+    return dict(kept), total
+
+
+def _split_groups(
+    trips: Sequence[TripEntry], by_value: Dict[int, List[int]], kept_counts: Dict[int, int]
+) -> Tuple[Dict[int, List[int]], Dict[int, List[int]], float]:
+    # v skupine ponechá kratšie jazdy; vráti aj reálny súčet ponechaných
+    kept_by_value: Dict[int, List[int]] = {}
+    removed_by_value: Dict[int, List[int]] = {}
+    kept_sum = 0.0
+    for value, indices in by_value.items():
+        ordered = sorted(indices, key=lambda i: _contribution(trips[i]))
+        keep = kept_counts.get(value, 0)
+        kept_by_value[value] = ordered[:keep]
+        removed_by_value[value] = ordered[keep:]
+        kept_sum += sum(_contribution(trips[i]) for i in ordered[:keep])
+    return kept_by_value, removed_by_value, kept_sum
+
+
+def trim_to_target(trips: Sequence[TripEntry], target: float) -> Tuple[List[TripEntry], List[TripEntry]]:
+    """
+    Rozdelí jazdy na (ponechané, odstránené) tak, aby súčet ponechaných bol
+    čo najbližšie k targetu (pri rovnosti nad targetom). Poradie jázd sa zachová.
+
+    Chyba zaokrúhlenia na celé km (pri tisícoch jázd desiatky km) sa kompenzuje
+    posunutím cieľa DP o zvyšnú odchýlku a výmenami jázd v rámci skupiny.
+    """
+    by_value: Dict[int, List[int]] = defaultdict(list)
+    for idx, trip in enumerate(trips):
+        by_value[int(round(_contribution(trip)))].append(idx)
+    groups = {value: len(indices) for value, indices in by_value.items()}
+
+    dp_target = int(round(target))
+    best = None
+    for _ in range(3):
+        kept_counts, _ = select_kept_counts(groups, dp_target)
+        split = _split_groups(trips, by_value, kept_counts)
+        error = split[2] - target
+        if best is None or abs(error) < abs(best[2] - target):
+            best = split
+        if abs(error) < 1:
+            break
+        dp_target -= int(round(error))
+
+    kept_by_value, removed_by_value, kept_sum = best
+    error = kept_sum - target
+
+    # v rámci skupiny sú jazdy zameniteľné (rovnaké celé km) – výmenou
+    # ponechaná ↔ odstránená sa doladí zvyšok pod 1 km
+    for value in sorted(by_value):
+        kept_idx, removed_idx = kept_by_value[value], removed_by_value[value]
+        while kept_idx and removed_idx:
+            # nad targetom: dlhšiu ponechanú za kratšiu odstránenú, pod: naopak
+            k, r = (-1, 0) if error > 0 else (0, -1)
+            delta = _contribution(trips[removed_idx[r]]) - _contribution(trips[kept_idx[k]])
+            if abs(error + delta) >= abs(error):
+                break
+            kept_idx[k], removed_idx[r] = removed_idx[r], kept_idx[k]
+            kept_idx.sort(key=lambda i: _contribution(trips[i]))
+            removed_idx.sort(key=lambda i: _contribution(trips[i]))
+            error += delta
+
+    removed_idx = {i for indices in removed_by_value.values() for i in indices}
+    kept = [trip for idx, trip in enumerate(trips) if idx not in removed_idx]
+    removed = [trip for idx, trip in enumerate(trips) if idx in removed_idx]
+    return kept, removed
@@ -1,19 +1,43 @@
 # web_app.py
-from typing import Dict, Any
-from uuid import uuid4
+from contextlib import asynccontextmanager
+import asyncio
 import io
+import json
 
 from fastapi import FastAPI, Form, Request
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 
 from service import run_logbook
-
-# In-memory storage výsledkov (jednoduché riešenie)
-RESULT_STORE: Dict[str, Dict[str, Any]] = {}
-
-app = FastAPI()
+from mcp_client import mcp_pool
+from dbcache_async import distance_cache
+from route_refresher import route_refresher
+from jobs import Job, QueueFull, job_queue, FAILED
+from result_store import result_store
+from llm_clients import aclose_clients
+from config import REFRESH_ENABLED
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # teplé MCP servery žijú počas celej doby behu aplikácie
+    await mcp_pool.start()
+    if REFRESH_ENABLED:
+        await route_refresher.start()
+    await job_queue.start()
+    try:
+        yield
+    finally:
+        await job_queue.stop()
+        await route_refresher.stop()
+        await mcp_pool.stop()
+        distance_cache.close()
+        await aclose_clients()
+
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 # templates/ folder pre HTML šablóny
 templates = Jinja2Templates(directory="templates")
@@ -34,6 +58,31 @@ async def index(request: Request):
     )
 
 
+async def _run_logbook_job(job: Job) -> None:
+    params = job.params
+    try:
+        df, csv_str, xlsx_bytes, total_km = await run_logbook(**params, progress=job.report)
+    except asyncio.CancelledError:
+        # pri vypínaní sa už nečaká na threadpool – krátky zápis priamo
+        result_store.put_failure(job.id, "Server sa vypína.")
+        raise
+    except Exception as e:
+        # značka zlyhania aj pre ostatné workery (polling z pending.html)
+        await run_in_threadpool(result_store.put_failure, job.id, str(e))
+        raise
+
+    # výsledok pod job_id (sťahovanie + stránka výsledku) – zdieľaný medzi workermi
+    await run_in_threadpool(result_store.put, job.id, {
+        "csv": csv_str,
+        "xlsx": xlsx_bytes,
+        "month": params["month"],
+        "year": params["year"],
+        "total_km": total_km,
+        "table_html": df.to_html(classes="table table-striped", index=False),
+        "params": params,
+    })
+
+
 @app.post("/generate", response_class=HTMLResponse)
 async def generate(
     request: Request,
@@ -43,50 +92,119 @@ async def generate(
     month: int = Form(...),
     year: int = Form(...),
 ):
-    # spustíme backend službu
-    df, csv_str, xlsx_bytes, total_km = await run_logbook(
-        start_city=start_city,
-        start_odo=start_odo,
-        end_odo=end_odo,
-        month=month,
-        year=year,
+    # job do fronty – odpoveď ide hneď, výsledok dobehne na pozadí
+    try:
+        job = job_queue.submit(
+            _run_logbook_job,
+            start_city=start_city,
+            start_odo=start_odo,
+            end_odo=end_odo,
+            month=month,
+            year=year,
+        )
+    except QueueFull:
+        return HTMLResponse(
+            "Server je momentálne vyťažený, skús to o chvíľu znova.",
+            status_code=503,
+            headers={"Retry-After": "30"},
+        )
+
+    return templates.TemplateResponse(
+        "pending.html",
+        {"request": request, "job_id": job.id, "start_city": start_city, "month": month, "year": year},
+        status_code=202,
     )
 
-    # uložíme výsledky do pamäte pod job_id
-    job_id = str(uuid4())
-    RESULT_STORE[job_id] = {
-        "csv": csv_str,
-        "xlsx": xlsx_bytes,
-        "month": month,
-        "year": year,
-        "total_km": total_km,
-    }
 
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = job_queue.get(job_id)
+    if job:
+        return job.to_dict()
+    # job bežal v inom workeri (alebo pred reštartom) – stav je v zdieľanom store
+    stored = await run_in_threadpool(result_store.status, job_id)
+    if stored:
+        status, error = stored
+        return {"job_id": job_id, "status": status, "error": error}
+    return JSONResponse({"error": "Neznámy job_id"}, status_code=404)
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        # job bežal v inom workeri – ak je dobehnutý v zdieľanom store, pošleme hneď done/failed
+        stored = await run_in_threadpool(result_store.status, job_id)
+        if stored:
+            status, error = stored
+            event = json.dumps({"stage": status, "detail": error or "", "at": 0}, ensure_ascii=False)
+            return StreamingResponse(
+                iter([f"event: {status}\ndata: {event}\n\n"]),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache"},
+            )
+        return JSONResponse({"error": "Neznámy job_id"}, status_code=404)
+
+    async def stream():
+        async for event in job.follow():
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event['stage']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
 
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    # premenné pre HTML – tabuľka z df
-    table_html = df.to_html(classes="table table-striped", index=False)
 
+@app.get("/jobs/{job_id}/result", response_class=HTMLResponse)
+async def job_result(request: Request, job_id: str):
+    job = job_queue.get(job_id)
+    data = await run_in_threadpool(result_store.get, job_id)
+    if not data:
+        if job and not job.finished:
+            params = job.params
+            return templates.TemplateResponse(
+                "pending.html",
+                {"request": request, "job_id": job.id, "start_city": params["start_city"],
+                 "month": params["month"], "year": params["year"]},
+                status_code=202,
+            )
+        if job:
+            return HTMLResponse(f"Generovanie zlyhalo: {job.error}", status_code=500)
+        stored = await run_in_threadpool(result_store.status, job_id)
+        if stored and stored[0] == FAILED:
+            return HTMLResponse(f"Generovanie zlyhalo: {stored[1]}", status_code=500)
+        return HTMLResponse("Generovanie zlyhalo: Neznámy job_id", status_code=404)
+
+    params = data["params"]
     return templates.TemplateResponse(
         "result.html",
         {
             "request": request,
             "job_id": job_id,
-            "table_html": table_html,
-            "start_city": start_city,
-            "start_odo": start_odo,
-            "end_odo": end_odo,
-            "month": month,
-            "year": year,
-            "target_km": end_odo - start_odo,
-            "total_km": total_km,
+            "table_html": data["table_html"],
+            "start_city": params["start_city"],
+            "start_odo": params["start_odo"],
+            "end_odo": params["end_odo"],
+            "month": params["month"],
+            "year": params["year"],
+            "target_km": params["end_odo"] - params["start_odo"],
+            "total_km": data["total_km"],
            },
     )
 
 
+@app.get("/metrics/results")
+async def result_metrics():
+    return await run_in_threadpool(result_store.stats)
+
+
 @app.get("/download/csv/{job_id}")
 async def download_csv(job_id: str):
-    data = RESULT_STORE.get(job_id)
+    data = await run_in_threadpool(result_store.get, job_id)
     if not data:
         return HTMLResponse("Neznámy job_id", status_code=404)
 
@@ -104,7 +222,7 @@ async def download_csv(job_id: str):
 
 @app.get("/download/xlsx/{job_id}")
 async def download_xlsx(job_id: str):
-    data = RESULT_STORE.get(job_id)
+    data = await run_in_threadpool(result_store.get, job_id)
     if not data:
         return HTMLResponse("Neznámy job_id", status_code=404)
 
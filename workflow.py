@@ -1,26 +1,56 @@
+from functools import lru_cache
+from typing import Optional
+
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 
+from config import PLANNER
 from models import AgentState
 from nodes import (
+    aai_planner_node,
     ai_planner_node,
+    aspeculative_planner_node,
     validator_node,
     py_trimmer_node,
     final_corrector_node,
     processor_node,
     route_planner,
+    speculative_planner_node,
 )
+from planner_solver import repair_node, solver_planner_node
+
+# planner -> uzol "ai_planner"; LLM plánovače majú sync aj async variant,
+# app.invoke volá func, app.ainvoke afunc (LLM volanie neblokuje event loop)
+PLANNERS = {
+    "llm": RunnableLambda(ai_planner_node, afunc=aai_planner_node),
+    "speculative": RunnableLambda(speculative_planner_node, afunc=aspeculative_planner_node),
+    "solver": solver_planner_node,
+}
+
+
+def build_workflow(entry_point: str = "ai_planner", planner: Optional[str] = None):
+    """
+    entry_point="validator" spustí graf nad hotovým plánom (ai_trip_plan) –
+    používa sa pri spresnení plánu z odhadov reálnymi trasami.
 
+    planner: "llm" (GPT plánovač, pestrejšie plány), "speculative" (k súbežných
+    LLM volaní, najlepší plán) alebo "solver" (deterministický planner_solver,
+    milisekundy); default PLANNER z configu.
+    """
+    planner = planner or PLANNER
+    if planner not in PLANNERS:
+        raise ValueError(f"Neznámy planner: {planner!r} ({' | '.join(PLANNERS)})")
 
-def build_workflow():
     workflow = StateGraph(AgentState)
 
-    workflow.add_node("ai_planner", ai_planner_node)
+    workflow.add_node("ai_planner", PLANNERS[planner])
     workflow.add_node("validator", validator_node)
+    workflow.add_node("repair", repair_node)
     workflow.add_node("py_trimmer", py_trimmer_node)
     workflow.add_node("final_corrector", final_corrector_node)
     workflow.add_node("processor", processor_node)
 
-    workflow.set_entry_point("ai_planner")
+    workflow.set_entry_point(entry_point)
 
     workflow.add_conditional_edges(
         "validator",
@@ -29,6 +59,16 @@ def build_workflow():
             "ai_planner": "ai_planner",
             "final_corrector": "final_corrector",
             "py_trimmer": "py_trimmer",
+            "repair": "repair",
+        },
+    )
+    workflow.add_conditional_edges(
+        "repair",
+        route_planner,
+        {
+            "validator": "validator",
+            "ai_planner": "ai_planner",
+            "final_corrector": "final_corrector",
         },
     )
 
@@ -38,3 +78,17 @@ def build_workflow():
     workflow.add_edge("processor", END)
 
     return workflow.compile()
+
+
+@lru_cache(maxsize=None)
+def _compiled_workflow(entry_point: str, planner: str):
+    return build_workflow(entry_point, planner)
+
+
+def get_workflow(entry_point: str = "ai_planner", planner: Optional[str] = None):
+    """
+    Skompilovaný graf zdieľaný v rámci procesu – build_workflow beží raz
+    pre každú kombináciu (entry_point, planner). Graf nemá checkpointer ani
+    vnútorný stav, súbežné invoke/ainvoke nad ním sú bezpečné.
+    """
+    return _compiled_workflow(entry_point, planner or PLANNER)